@@ -5,6 +5,7 @@ Provides secure, credit-based AI functionality for finance tracking
 
 from typing import Dict, Tuple, Any
 from django.conf import settings
+from django.db.models import F
 from cryptography.fernet import Fernet
 from django.contrib.auth import get_user_model
 from users.models import UserProfile, ActivityLog
@@ -94,6 +95,24 @@ class AIService:
         except UserProfile.DoesNotExist:
             return False
 
+    def reserve_credits(self, user: User, operation_type: str) -> bool:
+        """Atomically check and deduct credits in a single UPDATE.
+
+        Returns False when the user has no profile or too few credits.
+        """
+        credits_needed = self.credit_costs.get(operation_type, 1)
+        updated = UserProfile.objects.filter(
+            user=user, ai_credits_remaining__gte=credits_needed
+        ).update(ai_credits_remaining=F("ai_credits_remaining") - credits_needed)
+        return updated > 0
+
+    def refund_credits(self, user: User, operation_type: str) -> None:
+        """Return credits taken by reserve_credits when the operation failed"""
+        credits_used = self.credit_costs.get(operation_type, 1)
+        UserProfile.objects.filter(user=user).update(
+            ai_credits_remaining=F("ai_credits_remaining") + credits_used
+        )
+
     def get_ai_provider(self, user: User) -> BaseAIProvider:
         """Get the appropriate AI provider for the user"""
         try:
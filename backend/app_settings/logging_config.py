@@ -2,6 +2,11 @@
 Logging configuration with rotation support
 """
 
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # Build paths
@@ -12,6 +17,37 @@ LOGS_DIR = BASE_DIR / "logs"
 LOGS_DIR.mkdir(exist_ok=True)
 (LOGS_DIR / "django").mkdir(exist_ok=True)
 
+
+class ProcessQueueHandler(QueueHandler):
+    """Queue records for a listener thread that writes them through `sink`.
+
+    `sink` names a logger whose handlers do the console/file I/O, so request
+    threads only enqueue. The listener is started lazily in the process that
+    first emits: gunicorn and Celery workers are forked after logging is
+    configured and would not inherit a running thread.
+    """
+
+    def __init__(self, sink):
+        super().__init__(queue.SimpleQueue())
+        self.sink = sink
+        self._listener_pid = None
+
+    def enqueue(self, record):
+        # Runs under the handler lock, so only one listener starts per process
+        if self._listener_pid != os.getpid():
+            self._start_listener()
+        super().enqueue(record)
+
+    def _start_listener(self):
+        # A forked child gets a fresh queue rather than one whose internal
+        # state the parent's listener may have been holding
+        self.queue = queue.SimpleQueue()
+        listener = QueueListener(self.queue, logging.getLogger(self.sink))
+        listener.start()
+        atexit.register(listener.stop)
+        self._listener_pid = os.getpid()
+
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -29,6 +65,11 @@ LOGGING = {
         },
     },
     "handlers": {
+        # App loggers write here; "log_sink" below owns the real handlers
+        "queue": {
+            "()": "app_settings.logging_config.ProcessQueueHandler",
+            "sink": "log_sink",
+        },
         "console": {
             "level": "INFO",
             "class": "logging.StreamHandler",
@@ -84,25 +125,30 @@ LOGGING = {
             "propagate": False,
         },
         "ai": {
-            "handlers": ["console", "file_info", "file_error"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
         "users": {
-            "handlers": ["console", "file_info", "file_error"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
         "finance": {
-            "handlers": ["console", "file_info", "file_error"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
         "integrations": {
-            "handlers": ["console", "file_info", "file_error"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
+        "log_sink": {
+            "handlers": ["console", "file_info", "file_error"],
+            "level": "DEBUG",
+            "propagate": False,
+        },
     },
     "root": {
         "handlers": ["console", "file_error"],
@@ -127,6 +127,23 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing: Argon2 when argon2-cffi is installed, PBKDF2 otherwise.
+# Existing hashes keep verifying through the remaining hashers and are
+# upgraded to the first entry on the next successful login.
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+try:
+    import argon2  # noqa: F401
+except ImportError:
+    pass
+else:
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(2))
+
 # Internationalization
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
@@ -176,6 +193,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer",  # orjson when installed, else stock JSON
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 50,
     "EXCEPTION_HANDLER": "core.error_handlers.custom_exception_handler",
@@ -294,6 +315,11 @@ CACHES = {
     }
 }
 
+# Sessions only carry short-lived state such as the Gmail OAuth handshake, so
+# keep them in Redis instead of a django_session SELECT/UPDATE per request
+SESSION_ENGINE = config("SESSION_ENGINE", default="django.contrib.sessions.backends.cache")
+SESSION_CACHE_ALIAS = "default"
+
 # Celery Configuration for background tasks
 CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = config(
@@ -305,8 +331,12 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 
 # Celery Beat Schedule for periodic tasks
-
-
+CELERY_BEAT_SCHEDULE = {
+    "sweep-pending-account-deletions": {
+        "task": "users.tasks.sweep_pending_account_deletions",
+        "schedule": crontab(minute=0),
+    },
+}
 
 # Email Configuration
 EMAIL_BACKEND = config(
@@ -324,7 +354,7 @@ EMAIL_FETCH_LIMIT = config("EMAIL_FETCH_LIMIT", default=10000, cast=int)
 
 
 # Logging Configuration
-# Import logging configuration
+from app_settings.logging_config import LOGGING  # noqa: E402,F401
 
 # Custom User Model
 # AUTH_USER_MODEL = 'core.User'  # Using default Django User model
@@ -6,7 +6,7 @@ from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import DatabaseError, IntegrityError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -87,6 +87,19 @@ def custom_exception_handler(exc, context):
 
         response.data = standardized_response
 
+    elif isinstance(exc, DatabaseError):
+        # DRF leaves database errors unhandled; answer in the standard shape
+        # instead of Django's HTML 500 page
+        view = context.get("view")
+        logger.error(
+            "Database error in %s", view.__class__.__name__ if view else "view", exc_info=exc
+        )
+        response = StandardizedError(
+            APIErrorCodes.DATABASE_ERROR,
+            "A database error occurred while processing your request.",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        ).to_response()
+
     return response
 
 
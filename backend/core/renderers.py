@@ -0,0 +1,32 @@
+"""
+JSON renderer that encodes responses with orjson when it is installed.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional C encoder; DRF's json.dumps renderer is used without it
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer that uses orjson for compact output"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Indented output (e.g. the browsable API) keeps the stock encoder
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Datetimes and the types orjson does not know (Decimal, lazy strings,
+        # querysets...) are converted exactly as DRF's encoder would
+        return orjson.dumps(
+            data,
+            default=JSONEncoder().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
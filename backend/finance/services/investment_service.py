@@ -138,20 +138,32 @@ class InvestmentService(BaseService):
 
         return investment
 
-    def bulk_update_prices(self, price_updates):
-        """Bulk update prices for multiple investments"""
-        updated_count = 0
-        for symbol, price_data in price_updates.items():
-            try:
-                investment = self.get_user_queryset().get(symbol=symbol)
-                self.update_investment_price(
-                    investment.id, price_data["price"], price_data.get("source", "api")
-                )
-                updated_count += 1
-            except Investment.DoesNotExist:
-                continue
-
-        return updated_count
+    def bulk_update_prices(self, price_updates, queryset=None):
+        """Bulk update prices for multiple investments in a single query.
+
+        `price_updates` maps symbol -> {"price": ..., "source": ...}. Pass
+        `queryset` to restrict which of the user's investments are touched.
+        """
+        if queryset is None:
+            queryset = self.get_user_queryset()
+
+        now = timezone.now()
+        investments = list(
+            queryset.filter(symbol__in=list(price_updates)).only("id", "symbol")
+        )
+        for investment in investments:
+            price_data = price_updates[investment.symbol]
+            investment.current_price = price_data["price"]
+            investment.price_source = price_data.get("source", "api")
+            investment.last_price_update = now
+            investment.updated_at = now
+
+        Investment.objects.bulk_update(
+            investments,
+            ["current_price", "price_source", "last_price_update", "updated_at"],
+            batch_size=500,
+        )
+        return len(investments)
 
     def get_portfolio_performance(self, portfolio_name="Default"):
         """Get comprehensive portfolio performance metrics"""
@@ -1,6 +1,7 @@
+from celery import group
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from integrations.models import GoogleAccount
+from integrations.models import GmailAccount
 from integrations.tasks import fetch_emails_from_gmail
 import logging
 
@@ -28,48 +29,60 @@ class Command(BaseCommand):
 
         if user_id:
             # Sync specific user
-            try:
-                google_account = GoogleAccount.objects.get(user_id=user_id)
-                self.stdout.write(f"Syncing emails for user {google_account.user.username} ({user_id})")
-
-                if use_async:
-                    fetch_emails_from_gmail.delay(user_id)
-                    self.stdout.write("Task queued for async execution")
-                else:
-                    fetch_emails_from_gmail(user_id)
-                    self.stdout.write("Sync completed")
-
-            except GoogleAccount.DoesNotExist:
+            gmail_account = (
+                GmailAccount.objects.select_related('user')
+                .only('user__id', 'user__username')
+                .filter(user_id=user_id, is_active=True)
+                .first()
+            )
+            if gmail_account is None:
                 self.stdout.write(
                     self.style.ERROR(f"No Google account found for user {user_id}")
                 )
                 return
+
+            self.stdout.write(f"Syncing emails for user {gmail_account.user.username} ({user_id})")
+
+            if use_async:
+                fetch_emails_from_gmail.delay(user_id)
+                self.stdout.write("Task queued for async execution")
+            else:
+                fetch_emails_from_gmail(user_id)
+                self.stdout.write("Sync completed")
         else:
-            # Sync all users with Google accounts
-            google_accounts = GoogleAccount.objects.all()
+            # Sync all users with Google accounts; one query fetches accounts and users
+            gmail_accounts = list(
+                GmailAccount.objects.select_related('user')
+                .only('user__id', 'user__username', 'refresh_token')
+                .filter(is_active=True, refresh_token__isnull=False)
+                .exclude(refresh_token='')
+            )
 
-            if not google_accounts:
+            if not gmail_accounts:
                 self.stdout.write("No Google accounts found")
                 return
 
-            self.stdout.write(f"Found {google_accounts.count()} Google accounts to sync")
+            self.stdout.write(f"Found {len(gmail_accounts)} Google accounts to sync")
 
-            for account in google_accounts:
-                self.stdout.write(f"Syncing emails for {account.user.username} ({account.user.id})")
+            if use_async:
+                # Publish all tasks in one group rather than a broker round-trip per user
+                group(
+                    fetch_emails_from_gmail.s(account.user.id) for account in gmail_accounts
+                ).apply_async()
+                self.stdout.write(f"  Queued {len(gmail_accounts)} tasks for async execution")
+            else:
+                for account in gmail_accounts:
+                    self.stdout.write(f"Syncing emails for {account.user.username} ({account.user.id})")
 
-                try:
-                    if use_async:
-                        fetch_emails_from_gmail.delay(account.user.id)
-                        self.stdout.write("  Task queued for async execution")
-                    else:
+                    try:
                         fetch_emails_from_gmail(account.user.id)
                         self.stdout.write("  Sync completed")
 
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f"  Error syncing for {account.user.username}: {e}")
-                    )
-                    logger.error(f"Email sync error for user {account.user.id}: {e}")
+                    except Exception as e:
+                        self.stdout.write(
+                            self.style.ERROR(f"  Error syncing for {account.user.username}: {e}")
+                        )
+                        logger.error(f"Email sync error for user {account.user.id}: {e}")
 
         self.stdout.write(
             self.style.SUCCESS("Email sync process completed")
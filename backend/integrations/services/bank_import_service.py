@@ -5,7 +5,7 @@ Bank import service for processing bank statements and transaction files.
 import csv
 import io
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Dict, Optional
 from finance.models import Transaction, Account, Category
 from finance.services import TransactionService
@@ -213,6 +213,13 @@ class BankImportService:
 
     def _parse_date(self, date_string: str) -> datetime.date:
         """Parse date string in various formats"""
+        # ISO dates are the common case; fromisoformat avoids strptime entirely
+        if len(date_string) == 10 and date_string[4] == "-" and date_string[7] == "-":
+            try:
+                return date.fromisoformat(date_string)
+            except ValueError:
+                pass
+
         date_formats = [
             "%Y-%m-%d",
             "%m/%d/%Y",
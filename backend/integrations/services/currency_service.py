@@ -3,14 +3,23 @@ Currency service for exchange rates and currency conversion.
 """
 
 import requests
+import time
+import zlib
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
 from ..constants import SUPPORTED_CURRENCIES
 
 
+# Stampede protection for get_all_rates: the caller holding the lock fetches
+# from the API while others poll the cache for up to ~1 second
+RATES_LOCK_TIMEOUT = 30
+RATES_LOCK_POLLS = 20
+RATES_LOCK_POLL_INTERVAL = 0.05
+
+
 class CurrencyService:
     """Service for currency exchange rates and conversion"""
 
@@ -51,12 +60,26 @@ class CurrencyService:
         return None
 
     def get_all_rates(self, base_currency: str = "USD") -> Dict[str, Decimal]:
-        """Get all exchange rates for a base currency"""
+        """Get all exchange rates for a base currency.
+
+        On a cache miss only one caller fetches from the API; concurrent
+        callers wait briefly for it to fill the cache instead of all hitting
+        the upstream at once.
+        """
         cache_key = f"all_rates_{base_currency}"
         cached_rates = cache.get(cache_key)
         if cached_rates:
             return {k: Decimal(str(v)) for k, v in cached_rates.items()}
 
+        lock_key = f"{cache_key}_lock"
+        has_lock = cache.add(lock_key, 1, RATES_LOCK_TIMEOUT)
+        if not has_lock:
+            for _ in range(RATES_LOCK_POLLS):
+                time.sleep(RATES_LOCK_POLL_INTERVAL)
+                cached_rates = cache.get(cache_key)
+                if cached_rates:
+                    return {k: Decimal(str(v)) for k, v in cached_rates.items()}
+
         try:
             if self.api_key:
                 rates = self._fetch_all_api_rates(base_currency)
@@ -75,20 +98,33 @@ class CurrencyService:
         except Exception as e:
             print(f"Error fetching all rates for {base_currency}: {e}")
 
+        finally:
+            if has_lock:
+                cache.delete(lock_key)
+
         return {}
 
     def convert_amount(
         self, amount: Decimal, from_currency: str, to_currency: str
     ) -> Optional[Decimal]:
         """Convert amount from one currency to another"""
+        converted_amount, _ = self.convert_amount_with_rate(
+            amount, from_currency, to_currency
+        )
+        return converted_amount
+
+    def convert_amount_with_rate(
+        self, amount: Decimal, from_currency: str, to_currency: str
+    ) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        """Convert amount and return (converted_amount, rate) from one rate lookup"""
         if from_currency == to_currency:
-            return amount
+            return amount, Decimal("1.0")
 
         rate = self.get_exchange_rate(from_currency, to_currency)
         if rate:
-            return amount * rate
+            return amount * rate, rate
 
-        return None
+        return None, None
 
     def get_supported_currencies(self) -> List[Dict[str, str]]:
         """Get list of supported currencies"""
@@ -228,10 +264,8 @@ class CurrencyService:
             return rate
 
         # Generate a rate based on currency codes if not in mock data
-        import hashlib
-
         hash_key = f"{from_currency}{to_currency}"
-        seed = int(hashlib.md5(hash_key.encode()).hexdigest()[:8], 16)
+        seed = zlib.crc32(hash_key.encode())
         rate = Decimal(str(0.5 + (seed % 100) / 100))  # Rate between 0.5 and 1.5
 
         return rate
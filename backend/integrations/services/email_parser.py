@@ -5,6 +5,29 @@ from decimal import Decimal
 from datetime import datetime
 from typing import Dict, Optional, List, Tuple
 
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # Optional C parser; tags are stripped with a regex without it
+    HTMLParser = None
+
+
+# Strips tags when falling back to an HTML body
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def html_to_text(html_content: str) -> str:
+    """Convert an HTML body to plain text"""
+    if HTMLParser is not None:
+        try:
+            tree = HTMLParser(html_content)
+            tree.strip_tags(['script', 'style'])
+            node = tree.body or tree.root
+            if node is not None:
+                return node.text(separator=' ')
+        except Exception:
+            pass
+    return HTML_TAG_RE.sub(' ', html_content)
+
 
 class EmailParser:
     """Parse emails to extract transaction information"""
@@ -61,8 +84,19 @@ class EmailParser:
         ]
     }
 
+    # Compiled once for the class rather than per parser instance
+    COMPILED_AMOUNT_PATTERNS = tuple(
+        re.compile(pattern, re.IGNORECASE) for pattern in AMOUNT_PATTERNS
+    )
+
+    # All amount patterns fused into one alternation: answers "is there any
+    # amount?" in a single scan instead of one scan per pattern
+    ANY_AMOUNT_RE = re.compile(
+        '|'.join(f'(?:{pattern})' for pattern in AMOUNT_PATTERNS), re.IGNORECASE
+    )
+
     def __init__(self):
-        self.compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.AMOUNT_PATTERNS]
+        self.compiled_patterns = self.COMPILED_AMOUNT_PATTERNS
 
     def parse_gmail_message(self, gmail_message: Dict) -> Dict:
         """Parse a Gmail message and extract transaction data"""
@@ -129,28 +163,24 @@ class EmailParser:
         return None
 
     def _extract_email_body(self, payload: Dict) -> str:
-        """Extract plain text body from email payload"""
-        body = ""
-
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part.get('mimeType') == 'text/plain':
-                    data = part.get('body', {}).get('data', '')
-                    if data:
-                        body += base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                elif part.get('mimeType') == 'text/html' and not body:
-                    # Fallback to HTML if no plain text
-                    data = part.get('body', {}).get('data', '')
-                    if data:
-                        html_content = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                        # Simple HTML to text conversion
-                        body = re.sub(r'<[^>]+>', ' ', html_content)
-        elif payload.get('mimeType') == 'text/plain':
-            data = payload.get('body', {}).get('data', '')
+        """Extract plain text body from email payload.
+
+        text/plain is preferred; HTML is only decoded and parsed when the
+        message has no plain text alternative.
+        """
+        by_type = {}
+        for part in payload.get('parts') or [payload]:
+            by_type.setdefault(part.get('mimeType'), part)
+
+        for mime_type in ('text/plain', 'text/html'):
+            data = by_type.get(mime_type, {}).get('body', {}).get('data', '')
             if data:
                 body = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+                if mime_type == 'text/html':
+                    body = html_to_text(body)
+                return body.strip()
 
-        return body.strip()
+        return ""
 
     def _is_transaction_email(self, subject: str, body: str, sender: str) -> bool:
         """Determine if email contains transaction information"""
@@ -164,7 +194,7 @@ class EmailParser:
         ]
 
         # Check for amount patterns
-        has_amount = any(pattern.search(content) for pattern in self.compiled_patterns)
+        has_amount = self.ANY_AMOUNT_RE.search(content) is not None
 
         # Check for transaction keywords
         has_keywords = any(keyword in content for keyword in transaction_indicators)
@@ -1,4 +1,6 @@
+import base64
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db import transaction
@@ -29,88 +31,50 @@ class EmailSyncService:
     def sync_account_emails(self, gmail_account: GmailAccount, limit: int = 100) -> dict:
         """Sync emails for a specific Gmail account"""
         from training.models import RawEmail
-        import base64
 
         if not gmail_account.is_active:
             return {"error": "Account is not active", "processed": 0}
 
         try:
-            gmail_service = GmailService(gmail_account=gmail_account)
+            gmail_service = GmailService.for_account(gmail_account)
             query = self._build_query(gmail_account)
 
-            all_messages = []
-            page_token = None
-            while len(all_messages) < limit:
-                page_size = min(100, limit - len(all_messages))
-                messages, next_page_token = gmail_service.list_messages(
-                    query=query, max_results=page_size, page_token=page_token
-                )
-                all_messages.extend(messages)
-
-                if not next_page_token:
-                    break
-                page_token = next_page_token
-
             results = {
-                "total_fetched": len(all_messages),
+                "total_fetched": 0,
                 "processed": 0,
                 "transactions_created": 0,
                 "errors": []
             }
 
-            emails_to_store = []
-            for message in all_messages:
-                try:
-                    full_message = gmail_service.get_message(message['id'])
-
-                    headers = {h['name']: h['value'] for h in full_message['payload']['headers']}
-                    
-                    html_body_data = None
-                    if 'parts' in full_message['payload']:
-                        html_body_data = self._find_html_part(full_message['payload']['parts'])
-                    elif full_message['payload'].get('mimeType') == 'text/html':
-                        html_body_data = full_message['payload'].get('body', {}).get('data')
-
-                    html_body = ''
-                    if html_body_data:
-                        try:
-                            html_body = base64.urlsafe_b64decode(html_body_data.encode('ASCII')).decode('utf-8')
-                        except Exception as e:
-                            logger.warning(f"Could not decode HTML body for message {message['id']}: {e}")
-
-                    emails_to_store.append(
-                        RawEmail(
-                            user=gmail_account.user,
-                            gmail_account=gmail_account,
-                            message_id=full_message['id'],
-                            headers=headers,
-                            subject=headers.get('Subject', ''),
-                            sender=headers.get('From', ''),
-                            body_text=full_message.get('snippet', ''),
-                            body_html=html_body,
-                            received_at=datetime.fromtimestamp(int(full_message['internalDate']) / 1000, tz=timezone.utc)
-                        )
-                    )
-
-                    parsed_data = self.parser.parse_gmail_message(full_message)
-
-                    if parsed_data.get('is_transaction') and parsed_data.get('parsed_amount'):
-                        if parsed_data.get('confidence_score', 0) >= 0.5:
-                            transaction_created = self._create_transaction_from_email(
-                                gmail_account, parsed_data, message['id']
-                            )
-                            if transaction_created:
-                                results["transactions_created"] += 1
+            for message_ids, full_messages, fetch_errors in self._iter_fetched_pages(
+                gmail_service, query, limit
+            ):
+                results["total_fetched"] += len(message_ids)
 
+                emails_to_store = []
+                pending_transactions = []
+                for message_id in message_ids:
+                    raw_email, pending, error = self._process_message(
+                        gmail_account, message_id, full_messages, fetch_errors
+                    )
+                    if error is not None:
+                        logger.error(f"Error processing message {message_id}: {str(error)}")
+                        results["errors"].append(f"Message {message_id}: {str(error)}")
+                        continue
+
+                    emails_to_store.append(raw_email)
+                    if pending is not None:
+                        pending_transactions.append(pending)
                     results["processed"] += 1
 
-                except Exception as e:
-                    logger.error(f"Error processing message {message['id']}: {str(e)}")
-                    results["errors"].append(f"Message {message['id']}: {str(e)}")
+                if pending_transactions:
+                    results["transactions_created"] += self._create_transactions_from_emails(
+                        gmail_account, pending_transactions
+                    )
 
-            if emails_to_store:
-                RawEmail.objects.bulk_create(emails_to_store, ignore_conflicts=True)
-                logger.info(f"Stored {len(emails_to_store)} emails for training.")
+                if emails_to_store:
+                    RawEmail.objects.bulk_create(emails_to_store, ignore_conflicts=True)
+                    logger.info(f"Stored {len(emails_to_store)} emails for training.")
 
             gmail_account.last_sync_at = timezone.now()
             gmail_account.save()
@@ -118,9 +82,89 @@ class EmailSyncService:
             return results
 
         except Exception as e:
+            # Credentials may have been revoked; rebuild them on the next sync
+            GmailService.invalidate(gmail_account)
             logger.error(f"Error syncing emails for account {gmail_account.id}: {str(e)}")
             return {"error": str(e), "processed": 0}
 
+    def _iter_fetched_pages(self, gmail_service: GmailService, query: str, limit: int):
+        """Yield (message_ids, full_messages, fetch_errors) for each list page.
+
+        The next page is listed and batch-fetched on a background thread while
+        the caller processes the current one, so only one page is held at a time.
+        """
+        pages = gmail_service.iter_message_ids(query=query, limit=limit)
+
+        def fetch_next_page():
+            message_ids = next(pages, None)
+            if message_ids is None:
+                return None
+            full_messages, fetch_errors = gmail_service.get_messages(message_ids)
+            return message_ids, full_messages, fetch_errors
+
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            future = prefetcher.submit(fetch_next_page)
+            while True:
+                page = future.result()
+                if page is None:
+                    break
+                future = prefetcher.submit(fetch_next_page)
+                yield page
+
+    def _process_message(self, gmail_account: GmailAccount, message_id: str, full_messages: dict, fetch_errors: dict):
+        """Decode and parse one fetched message.
+
+        Only builds objects; the caller does the database writes for the
+        whole page. Returns (raw_email, pending_transaction, error); pending
+        is a (message_id, parsed_data) tuple when the email should become a
+        transaction.
+        """
+        from training.models import RawEmail
+
+        try:
+            if message_id in fetch_errors:
+                raise fetch_errors[message_id]
+            full_message = full_messages[message_id]
+
+            headers = {h['name']: h['value'] for h in full_message['payload']['headers']}
+
+            html_body_data = None
+            if 'parts' in full_message['payload']:
+                html_body_data = self._find_html_part(full_message['payload']['parts'])
+            elif full_message['payload'].get('mimeType') == 'text/html':
+                html_body_data = full_message['payload'].get('body', {}).get('data')
+
+            html_body = ''
+            if html_body_data:
+                try:
+                    html_body = base64.urlsafe_b64decode(html_body_data.encode('ASCII')).decode('utf-8')
+                except Exception as e:
+                    logger.warning(f"Could not decode HTML body for message {message_id}: {e}")
+
+            raw_email = RawEmail(
+                user=gmail_account.user,
+                gmail_account=gmail_account,
+                message_id=full_message['id'],
+                headers=headers,
+                subject=headers.get('Subject', ''),
+                sender=headers.get('From', ''),
+                body_text=full_message.get('snippet', ''),
+                body_html=html_body,
+                received_at=datetime.fromtimestamp(int(full_message['internalDate']) / 1000, tz=timezone.utc)
+            )
+
+            parsed_data = self.parser.parse_gmail_message(full_message)
+
+            pending = None
+            if parsed_data.get('is_transaction') and parsed_data.get('parsed_amount'):
+                if parsed_data.get('confidence_score', 0) >= 0.5:
+                    pending = (message_id, parsed_data)
+
+            return raw_email, pending, None
+
+        except Exception as e:
+            return None, None, e
+
     def sync_all_active_accounts(self) -> dict:
         """Sync emails for all active Gmail accounts"""
         active_accounts = GmailAccount.objects.filter(is_active=True)
@@ -175,43 +219,76 @@ class EmailSyncService:
 
         return " ".join(query_parts)
 
-    def _create_transaction_from_email(self, gmail_account: GmailAccount, parsed_data: dict, message_id: str) -> bool:
-        """Create a transaction from parsed email data"""
+    def _create_transactions_from_emails(self, gmail_account: GmailAccount, pending: list) -> int:
+        """Create transactions for parsed emails in bulk, skipping ones already imported.
+
+        `pending` is a list of (message_id, parsed_data) tuples. Returns the
+        number of transactions inserted.
+        """
         from finance.models.transactions import Transaction
-        from django.db import transaction
 
         try:
-            # Check if a transaction with this message_id already exists
-            if Transaction.objects.filter(gmail_message_id=message_id).exists():
-                logger.info(f"Transaction with message_id {message_id} already exists. Skipping.")
-                return False
-
-            with transaction.atomic():
-                category = self._determine_category(parsed_data, gmail_account)
-
-                # Create the transaction
-                Transaction.objects.create(
-                    user=gmail_account.user,
-                    amount=parsed_data['parsed_amount'],
-                    description=parsed_data.get('parsed_description', 'Email transaction'),
-                    date=parsed_data.get('parsed_date', timezone.now().date()),
-                    currency=parsed_data.get('parsed_currency', 'USD'),
-                    category=category,
-                    gmail_message_id=message_id,
-                    transaction_type=parsed_data.get('transaction_type', 'expense'),
-                    # account is left null as we can't determine it from the email
+            message_ids = [message_id for message_id, _ in pending]
+            existing_ids = set(
+                Transaction.objects.filter(gmail_message_id__in=message_ids)
+                .values_list('gmail_message_id', flat=True)
+            )
+            if existing_ids:
+                logger.info(f"Skipping {len(existing_ids)} emails already imported as transactions.")
+
+            category_cache = {}
+            new_transactions = []
+            for message_id, parsed_data in pending:
+                if message_id in existing_ids:
+                    continue
+                existing_ids.add(message_id)
+
+                new_transactions.append(
+                    Transaction(
+                        user=gmail_account.user,
+                        amount=parsed_data['parsed_amount'],
+                        description=parsed_data.get('parsed_description', 'Email transaction'),
+                        date=parsed_data.get('parsed_date', timezone.now().date()),
+                        currency=parsed_data.get('parsed_currency', 'USD'),
+                        category=self._determine_category(parsed_data, gmail_account, category_cache),
+                        gmail_message_id=message_id,
+                        transaction_type=parsed_data.get('transaction_type', 'expense'),
+                        # account is left null as we can't determine it from the email
+                    )
                 )
-            logger.info(f"Successfully created transaction from email for user {gmail_account.user.id}")
-            return True
+
+            if not new_transactions:
+                return 0
+
+            # The unique gmail_message_id constraint drops rows a concurrent sync
+            # inserted, and ignore_conflicts does not report how many were kept,
+            # so count the new ids present before and after the insert
+            new_ids = Transaction.objects.filter(
+                gmail_message_id__in=[t.gmail_message_id for t in new_transactions]
+            )
+            present_before = new_ids.count()
+            Transaction.objects.bulk_create(new_transactions, ignore_conflicts=True, batch_size=500)
+            created = new_ids.count() - present_before
+            logger.info(
+                f"Created {created} transactions from email for user {gmail_account.user.id}"
+            )
+            return created
 
         except Exception as e:
-            logger.error(f"Error creating transaction from email: {str(e)}")
-            return False
+            logger.error(f"Error creating transactions from email: {str(e)}")
+            return 0
 
-    def _determine_category(self, parsed_data: dict, gmail_account):
-        """Determine transaction category based on parsed data"""
+    def _determine_category(self, parsed_data: dict, gmail_account, category_cache: dict = None):
+        """Determine transaction category based on parsed data.
+
+        Pass a `category_cache` dict to reuse categories resolved earlier in
+        the same sync run instead of issuing get_or_create for every email.
+        """
         from finance.models import Category
 
+        if category_cache is None:
+            category_cache = {}
+
         description = parsed_data.get('parsed_description', '').lower()
 
         # Simple category mapping based on keywords
@@ -227,17 +304,19 @@ class EmailSyncService:
 
         for category_name, keywords in category_keywords.items():
             if any(keyword in description for keyword in keywords):
-                category, created = Category.objects.get_or_create(
-                    name=category_name.title(),
-                    user=gmail_account.user,
-                    defaults={'category_type': 'expense', 'color': '#3B82F6', 'icon': '📁'}
-                )
-                return category
+                if category_name not in category_cache:
+                    category_cache[category_name], created = Category.objects.get_or_create(
+                        name=category_name.title(),
+                        user=gmail_account.user,
+                        defaults={'category_type': 'expense', 'color': '#3B82F6', 'icon': '📁'}
+                    )
+                return category_cache[category_name]
 
         # Default category
-        default_category, created = Category.objects.get_or_create(
-            name='Other',
-            user=gmail_account.user,
-            defaults={'category_type': 'expense', 'color': '#6B7280', 'icon': '📋'}
-        )
-        return default_category
\ No newline at end of file
+        if 'other' not in category_cache:
+            category_cache['other'], created = Category.objects.get_or_create(
+                name='Other',
+                user=gmail_account.user,
+                defaults={'category_type': 'expense', 'color': '#6B7280', 'icon': '📋'}
+            )
+        return category_cache['other']
@@ -6,6 +6,13 @@ from django.conf import settings
 from django.utils import timezone
 
 
+# GmailService instances reused by long-lived Celery workers, keyed by account id
+_SERVICE_CACHE = {}
+
+# Cached credentials are rebuilt this long before the access token expires
+CREDENTIALS_EXPIRY_SKEW = datetime.timedelta(seconds=60)
+
+
 class GmailService:
     SCOPES = [
         "https://www.googleapis.com/auth/gmail.readonly",
@@ -14,6 +21,9 @@ class GmailService:
         "openid"
     ]
 
+    # Gmail accepts up to 100 calls per batch but rate-limits batches above 50
+    BATCH_SIZE = 50
+
     def __init__(self, gmail_account=None, user=None):
         if gmail_account:
             self.gmail_account = gmail_account
@@ -30,6 +40,44 @@ class GmailService:
 
         self.creds = self._get_credentials()
 
+    @classmethod
+    def for_account(cls, gmail_account):
+        """Return a cached service for the account while its token stays valid.
+
+        Repeated syncs of the same account in a worker skip rebuilding and
+        refreshing credentials. The cache entry is ignored once the stored
+        access token changes or the token is about to expire.
+        """
+        cached = _SERVICE_CACHE.get(gmail_account.id)
+        if (
+            cached is not None
+            and cached.creds.token == gmail_account.access_token
+            and cached._credentials_fresh()
+        ):
+            return cached
+
+        service = cls(gmail_account=gmail_account)
+        if service.creds:
+            _SERVICE_CACHE[gmail_account.id] = service
+        else:
+            _SERVICE_CACHE.pop(gmail_account.id, None)
+        return service
+
+    @classmethod
+    def invalidate(cls, gmail_account):
+        """Drop the cached service for an account, e.g. after an API error"""
+        _SERVICE_CACHE.pop(gmail_account.id, None)
+
+    def _credentials_fresh(self):
+        """Check the credentials are valid and not within the expiry skew"""
+        if not self.creds.valid:
+            return False
+        if self.creds.expiry is None:
+            return True
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return self.creds.expiry - CREDENTIALS_EXPIRY_SKEW > now
+
     def _get_credentials(self):
         """Retrieve and refresh Google OAuth credentials from the database."""
         if not self.gmail_account:
@@ -117,6 +165,35 @@ class GmailService:
         next_page_token = results.get("nextPageToken")
         return messages, next_page_token
 
+    def iter_message_ids(self, query="in:inbox", limit=100, page_size=100):
+        """Yield message ids one list page at a time, up to `limit` ids in total."""
+        if not self.creds:
+            raise Exception("Google credentials not available for user.")
+
+        service = build("gmail", "v1", credentials=self.creds, cache_discovery=False)
+        page_token = None
+        remaining = limit
+        while remaining > 0:
+            results = (
+                service.users()
+                .messages()
+                .list(
+                    userId="me",
+                    q=query,
+                    maxResults=min(page_size, remaining),
+                    pageToken=page_token,
+                )
+                .execute()
+            )
+            message_ids = [message["id"] for message in results.get("messages", [])]
+            if message_ids:
+                yield message_ids
+            remaining -= len(message_ids)
+
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+
     def get_message(self, msg_id):
         if not self.creds:
             raise Exception("Google credentials not available for user.")
@@ -130,6 +207,35 @@ class GmailService:
         )
         return msg
 
+    def get_messages(self, msg_ids):
+        """Fetch full messages using batched HTTP requests.
+
+        Returns a (messages, errors) pair of dicts keyed by message id.
+        """
+        if not self.creds:
+            raise Exception("Google credentials not available for user.")
+
+        service = build("gmail", "v1", credentials=self.creds, cache_discovery=False)
+        messages = {}
+        errors = {}
+
+        def collect(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                messages[request_id] = response
+
+        for start in range(0, len(msg_ids), self.BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=collect)
+            for msg_id in msg_ids[start:start + self.BATCH_SIZE]:
+                batch.add(
+                    service.users().messages().get(userId="me", id=msg_id, format="full"),
+                    request_id=msg_id,
+                )
+            batch.execute()
+
+        return messages, errors
+
     def test_connection(self):
         """Test Gmail API connection and return user profile info."""
         if not self.creds:
@@ -2,14 +2,64 @@
 Stock price integration service for fetching real-time market data.
 """
 
+import logging
 import requests
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from typing import Dict, List, Optional
 from django.conf import settings
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from finance.services import InvestmentService
 
 
+logger = logging.getLogger(__name__)
+
+# Retry policy for market data calls: Twelve Data answers 429/5xx under load,
+# so transient failures are retried with exponential backoff (1s, 2s, 4s)
+# honouring any Retry-After header before the caller gives up.
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=1.0,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    respect_retry_after_header=True,
+)
+
+
+# Concurrent batch requests issued by fetch_prices_chunked
+BATCH_FETCH_WORKERS = 4
+
+# Maximum number of matches returned by search_stocks
+SEARCH_RESULTS_LIMIT = 10
+
+# Multipliers used to derive mock quote fields from a mock price
+MOCK_OPEN_RATIO = Decimal("0.98")
+MOCK_HIGH_RATIO = Decimal("1.05")
+MOCK_LOW_RATIO = Decimal("0.95")
+MOCK_PREVIOUS_CLOSE_RATIO = Decimal("0.99")
+MOCK_CHANGE_RATIO = Decimal("0.01")
+MOCK_PERCENT_CHANGE = Decimal("1.01")
+
+
+def to_decimal(value) -> Decimal:
+    """Convert an API value to Decimal, skipping str() for string payloads"""
+    if isinstance(value, str):
+        return Decimal(value)
+    return Decimal(str(value))
+
+
+def build_retrying_session() -> requests.Session:
+    """Create a pooled HTTP session that retries transient failures"""
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=RETRY_POLICY)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class StockPriceService:
     """Service for fetching stock prices from external APIs"""
 
@@ -18,6 +68,9 @@ class StockPriceService:
         self.base_url = getattr(
             settings, "STOCK_API_URL", "https://api.twelvedata.com/v1"
         )
+        # Twelve Data caps symbols per batch request (8 free, 120 paid)
+        self.batch_size = getattr(settings, "STOCK_API_BATCH_SIZE", 8)
+        self.session = build_retrying_session()
 
     def fetch_stock_price(self, symbol: str) -> Optional[Dict]:
         """Fetch current stock price for a symbol"""
@@ -29,7 +82,7 @@ class StockPriceService:
             url = f"{self.base_url}/price"
             params = {"symbol": symbol, "apikey": self.api_key}
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -37,13 +90,13 @@ class StockPriceService:
             if "price" in data:
                 return {
                     "symbol": symbol,
-                    "price": Decimal(str(data["price"])),
+                    "price": to_decimal(data["price"]),
                     "timestamp": timezone.now(),
                     "source": "api",
                 }
 
-        except Exception as e:
-            print(f"Error fetching price for {symbol}: {e}")
+        except Exception:
+            logger.exception("Error fetching price for %s", symbol)
             return None
 
         return None
@@ -63,10 +116,11 @@ class StockPriceService:
             url = f"{self.base_url}/price"
             params = {"symbol": symbol_string, "apikey": self.api_key}
 
-            response = requests.get(url, params=params, timeout=15)
+            response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
 
             data = response.json()
+            now = timezone.now()
 
             # Handle both single and batch responses
             if isinstance(data, dict):
@@ -74,8 +128,8 @@ class StockPriceService:
                     # Single symbol response
                     prices[symbols[0]] = {
                         "symbol": symbols[0],
-                        "price": Decimal(str(data["price"])),
-                        "timestamp": timezone.now(),
+                        "price": to_decimal(data["price"]),
+                        "timestamp": now,
                         "source": "api",
                     }
                 else:
@@ -84,21 +138,49 @@ class StockPriceService:
                         if "price" in price_data:
                             prices[symbol] = {
                                 "symbol": symbol,
-                                "price": Decimal(str(price_data["price"])),
-                                "timestamp": timezone.now(),
+                                "price": to_decimal(price_data["price"]),
+                                "timestamp": now,
                                 "source": "api",
                             }
 
-        except Exception as e:
-            print(f"Error fetching batch prices: {e}")
+        except Exception:
+            logger.exception("Error fetching batch prices")
             # Return mock data as fallback
             return {symbol: self._get_mock_data(symbol) for symbol in symbols}
 
         return prices
 
-    def update_investment_prices(self, user, symbols: List[str] = None) -> Dict:
-        """Update prices for user's investments"""
-        investment_service = InvestmentService(user=user)
+    def fetch_prices_chunked(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Fetch prices in batches no larger than the API's per-request cap"""
+        chunks = [
+            symbols[i : i + self.batch_size]
+            for i in range(0, len(symbols), self.batch_size)
+        ]
+        if len(chunks) <= 1:
+            return self.fetch_batch_prices(symbols)
+
+        prices = {}
+        with ThreadPoolExecutor(
+            max_workers=min(BATCH_FETCH_WORKERS, len(chunks))
+        ) as executor:
+            for chunk_prices in executor.map(self.fetch_batch_prices, chunks):
+                prices.update(chunk_prices)
+
+        return prices
+
+    def update_investment_prices(
+        self,
+        user,
+        symbols: List[str] = None,
+        investment_service: InvestmentService = None,
+    ) -> Dict:
+        """Update prices for user's investments.
+
+        Callers updating in a loop can pass a prebuilt `investment_service`
+        to reuse it across calls.
+        """
+        if investment_service is None:
+            investment_service = InvestmentService(user=user)
 
         if symbols:
             investments = investment_service.get_user_queryset().filter(
@@ -109,30 +191,25 @@ class StockPriceService:
                 auto_update_price=True, is_active=True
             )
 
-        symbols_to_update = [inv.symbol for inv in investments]
+        investment_symbols = list(investments.values_list("symbol", flat=True))
 
-        if not symbols_to_update:
+        if not investment_symbols:
             return {"updated": 0, "failed": 0, "message": "No investments to update"}
 
-        price_data = self.fetch_batch_prices(symbols_to_update)
-
-        updated_count = 0
-        failed_count = 0
+        symbols_to_update = list(dict.fromkeys(investment_symbols))
+        price_data = self.fetch_prices_chunked(symbols_to_update)
+        price_updates = {
+            symbol: data for symbol, data in price_data.items() if data
+        }
 
-        for investment in investments:
-            symbol = investment.symbol
-            if symbol in price_data and price_data[symbol]:
-                try:
-                    new_price = price_data[symbol]["price"]
-                    investment_service.update_investment_price(
-                        investment.id, new_price, "api"
-                    )
-                    updated_count += 1
-                except Exception as e:
-                    print(f"Failed to update {symbol}: {e}")
-                    failed_count += 1
-            else:
-                failed_count += 1
+        try:
+            updated_count = investment_service.bulk_update_prices(
+                price_updates, queryset=investments
+            )
+        except Exception:
+            logger.exception("Failed to update investment prices")
+            updated_count = 0
+        failed_count = len(investment_symbols) - updated_count
 
         return {
             "updated": updated_count,
@@ -149,7 +226,7 @@ class StockPriceService:
             url = f"{self.base_url}/quote"
             params = {"symbol": symbol, "apikey": self.api_key}
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -157,20 +234,20 @@ class StockPriceService:
             return {
                 "symbol": data.get("symbol", symbol),
                 "name": data.get("name", ""),
-                "price": Decimal(str(data.get("close", 0))),
-                "open": Decimal(str(data.get("open", 0))),
-                "high": Decimal(str(data.get("high", 0))),
-                "low": Decimal(str(data.get("low", 0))),
+                "price": to_decimal(data.get("close", 0)),
+                "open": to_decimal(data.get("open", 0)),
+                "high": to_decimal(data.get("high", 0)),
+                "low": to_decimal(data.get("low", 0)),
                 "volume": data.get("volume", 0),
-                "previous_close": Decimal(str(data.get("previous_close", 0))),
-                "change": Decimal(str(data.get("change", 0))),
-                "percent_change": Decimal(str(data.get("percent_change", 0))),
+                "previous_close": to_decimal(data.get("previous_close", 0)),
+                "change": to_decimal(data.get("change", 0)),
+                "percent_change": to_decimal(data.get("percent_change", 0)),
                 "timestamp": timezone.now(),
                 "source": "api",
             }
 
-        except Exception as e:
-            print(f"Error fetching quote for {symbol}: {e}")
+        except Exception:
+            logger.exception("Error fetching quote for %s", symbol)
             return None
 
     def search_stocks(self, query: str) -> List[Dict]:
@@ -180,16 +257,20 @@ class StockPriceService:
 
         try:
             url = f"{self.base_url}/symbol_search"
-            params = {"symbol": query, "apikey": self.api_key}
+            params = {
+                "symbol": query,
+                "outputsize": SEARCH_RESULTS_LIMIT,
+                "apikey": self.api_key,
+            }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
 
             data = response.json()
 
             results = []
             if "data" in data:
-                for item in data["data"][:10]:  # Limit to 10 results
+                for item in data["data"][:SEARCH_RESULTS_LIMIT]:
                     results.append(
                         {
                             "symbol": item.get("symbol", ""),
@@ -202,21 +283,19 @@ class StockPriceService:
 
             return results
 
-        except Exception as e:
-            print(f"Error searching stocks with query '{query}': {e}")
+        except Exception:
+            logger.exception("Error searching stocks with query '%s'", query)
             return []
 
     def _get_mock_data(self, symbol: str) -> Dict:
         """Generate mock price data for development"""
-        # Simple mock data based on symbol hash
-        import hashlib
-
-        seed = int(hashlib.md5(symbol.encode()).hexdigest()[:8], 16)
+        # Simple mock data based on a cheap, deterministic symbol checksum
+        seed = zlib.crc32(symbol.encode())
         base_price = (seed % 1000) + 10  # Price between 10-1010
 
         return {
             "symbol": symbol,
-            "price": Decimal(str(base_price + (seed % 10))),
+            "price": Decimal(base_price + (seed % 10)),
             "timestamp": timezone.now(),
             "source": "mock",
         }
@@ -230,13 +309,13 @@ class StockPriceService:
             "symbol": symbol,
             "name": f"{symbol} Corp",
             "price": price,
-            "open": price * Decimal("0.98"),
-            "high": price * Decimal("1.05"),
-            "low": price * Decimal("0.95"),
+            "open": price * MOCK_OPEN_RATIO,
+            "high": price * MOCK_HIGH_RATIO,
+            "low": price * MOCK_LOW_RATIO,
             "volume": 1000000,
-            "previous_close": price * Decimal("0.99"),
-            "change": price * Decimal("0.01"),
-            "percent_change": Decimal("1.01"),
+            "previous_close": price * MOCK_PREVIOUS_CLOSE_RATIO,
+            "change": price * MOCK_CHANGE_RATIO,
+            "percent_change": MOCK_PERCENT_CHANGE,
             "timestamp": timezone.now(),
             "source": "mock",
         }
@@ -1,9 +1,16 @@
-from celery import shared_task
+from celery import group, shared_task
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from ai.ai_service import ai_service
 from integrations.models import GmailAccount
 from integrations.services.email_sync_service import EmailSyncService
+from users.models import UserProfile
+from functools import lru_cache
+import json
 import logging
+import random
+import re
+import time
 
 from django.conf import settings
 
@@ -12,23 +19,53 @@ User = get_user_model()
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Backoff policy for AI provider calls
+AI_MAX_RETRIES = 3
+AI_BACKOFF_CAP = 30
+AI_BACKOFF_JITTER = 0.5
+
+# Maximum number of email characters sent to the AI provider
+AI_PROMPT_TEXT_LIMIT = 1500
+
+# Characters kept before the first amount token when windowing the prompt text
+AI_PROMPT_LEAD_CHARS = 600
+
+JSON_DECODER = json.JSONDecoder()
+
+# Provider error fragments that indicate a transient failure worth retrying.
+# Anything else (bad credentials, invalid request) fails fast.
+RECOVERABLE_AI_ERRORS = (
+    "rate limit",
+    "429",
+    "500",
+    "502",
+    "503",
+    "504",
+    "timeout",
+    "timed out",
+    "temporarily",
+    "connection",
+)
+
 
 @shared_task
 def sync_gmail_account(account_id):
     """Sync emails for a specific Gmail account"""
     try:
-        gmail_account = GmailAccount.objects.get(id=account_id, is_active=True)
+        gmail_account = GmailAccount.objects.select_related("user").get(
+            id=account_id, is_active=True
+        )
         sync_service = EmailSyncService()
         limit = settings.EMAIL_FETCH_LIMIT
         result = sync_service.sync_account_emails(gmail_account, limit=limit)
 
-        logger.info(f"Email sync completed for account {account_id}: {result}")
+        logger.info("Email sync completed for account %s: %s", account_id, result)
         return result
     except GmailAccount.DoesNotExist:
-        logger.error(f"Gmail account {account_id} not found or inactive")
+        logger.error("Gmail account %s not found or inactive", account_id)
         return {"error": "Account not found or inactive"}
     except Exception as e:
-        logger.error(f"Error syncing Gmail account {account_id}: {str(e)}")
+        logger.error("Error syncing Gmail account %s: %s", account_id, e)
         return {"error": str(e)}
 
 
@@ -38,133 +75,275 @@ def fetch_emails_from_gmail(user_id):
     try:
         user = User.objects.get(id=user_id)
         # Get first active Gmail account for the user
-        gmail_account = GmailAccount.objects.filter(user=user, is_active=True).first()
-
-        if not gmail_account:
-            logger.warning(f"No active Gmail account found for user {user_id}")
+        gmail_account_id = (
+            GmailAccount.objects.filter(user=user, is_active=True)
+            .values_list("id", flat=True)
+            .first()
+        )
+
+        if not gmail_account_id:
+            logger.warning("No active Gmail account found for user %s", user_id)
             return {"error": "No active Gmail account found"}
 
-        return sync_gmail_account.delay(gmail_account.id)
+        return sync_gmail_account.delay(gmail_account_id)
 
     except User.DoesNotExist:
-        logger.error(f"User not found for user_id: {user_id}")
+        logger.error("User not found for user_id: %s", user_id)
         return {"error": "User not found"}
 
 
-def extract_transaction_data(user, email_text, msg_id):
-    """Enhanced transaction data extraction with multiple patterns and AI fallback"""
+# Enhanced regex patterns for different email formats, compiled once at import
+AMOUNT_PATTERNS = [
+    r"\$([0-9,]+\.?[0-9]*)",  # $123.45, $1,234.56, $123
+    r"([0-9,]+\.?[0-9]*)\s*USD",  # 123.45 USD
+    r"(?:Amount|Total|Charged|Payment):?\s*\$?([0-9,]+\.?[0-9]*)",  # Amount/Total/Charged/Payment: $123.45
+    r"(\d+\.\d{2})\s*(?:was|has been)\s*(?:charged|debited)",  # 123.45 was charged
+]
+
+# The lazy vendor captures are bounded to 64 characters: unbounded, `re`
+# retries them from every offset of a long alphanumeric run, which is
+# quadratic on large HTML-stripped bodies. No real merchant name is longer.
+VENDOR_PATTERNS = [
+    r"from\s+([A-Za-z0-9\s&\-\.]{1,64}?)(?:\s+for|\s+on|\s*\$)",  # from VENDOR for/on/$
+    r"at\s+([A-Za-z0-9\s&\-\.]{1,64}?)(?:\s+for|\s+on|\s*\$)",  # at VENDOR
+    r"([A-Za-z0-9\s&\-\.]{1,64}?)\s*charged",  # VENDOR charged
+    r"Purchase\s+at\s+([A-Za-z0-9\s&\-\.]+)",  # Purchase at VENDOR
+    r"Transaction\s+at\s+([A-Za-z0-9\s&\-\.]+)",  # Transaction at VENDOR
+    r"(?:merchant|seller):\s*([A-Za-z0-9\s&\-\.]+)",  # merchant: VENDOR
+]
+
+DATE_PATTERNS = [
+    r"on\s+([A-Za-z]{3}\s+[0-9]{1,2},?\s+[0-9]{4})",  # on Jan 15, 2024
+    r"([A-Za-z]{3}\s+[0-9]{1,2},?\s+[0-9]{4})",  # Jan 15, 2024
+    r"([0-9]{1,2}/[0-9]{1,2}/[0-9]{4})",  # 01/15/2024
+    r"([0-9]{4}-[0-9]{2}-[0-9]{2})",  # 2024-01-15
+    r"Date:\s*([A-Za-z]{3}\s+[0-9]{1,2},?\s+[0-9]{4})",  # Date: / Transaction date: Jan 15, 2024
+]
+
+# Cheap check for a currency symbol or decimal amount anywhere in an email
+AMOUNT_HINT_RE = re.compile(r"\$|USD|\d\.\d{2}", re.IGNORECASE)
+
+PATTERN_CATEGORIES = {
+    "amount": AMOUNT_PATTERNS,
+    "vendor": VENDOR_PATTERNS,
+    "date": DATE_PATTERNS,
+}
+
+# Literal words at least one pattern in the category needs (lowercase). If none
+# occur in an email the category's regexes cannot match and are skipped.
+# Dates have no literal anchor and are always scanned.
+CATEGORY_ANCHORS = {
+    "amount": ("$", "usd", "amount", "total", "charged", "payment", "debited"),
+    "vendor": ("from", "at", "charged", "merchant", "seller"),
+}
+
+
+def _active_categories(email_text):
+    """Return the pattern categories whose literal anchors occur in the text"""
+    lowered = email_text.lower()
+    anchored = {
+        category
+        for category, words in CATEGORY_ANCHORS.items()
+        if any(word in lowered for word in words)
+    }
+
+    return tuple(
+        category
+        for category in PATTERN_CATEGORIES
+        if category not in CATEGORY_ANCHORS or category in anchored
+    )
+
+
+COMPILED_PATTERNS = {
+    category: [re.compile(p, re.IGNORECASE) for p in patterns]
+    for category, patterns in PATTERN_CATEGORIES.items()
+}
+
+
+def _category_matches(email_text, category, active_categories):
+    """Yield (pattern, capture) for a category in pattern priority order.
+
+    Patterns are searched lazily one at a time, so callers that stop at the
+    first usable capture never run the remaining patterns. Categories whose
+    anchors are absent from the email yield nothing.
+    """
+    if category not in active_categories:
+        return
+
+    for pattern, compiled in zip(PATTERN_CATEGORIES[category], COMPILED_PATTERNS[category]):
+        match = compiled.search(email_text)
+        if match:
+            yield pattern, match.group(1)
+
+
+def _extract_with_patterns(email_text, msg_id):
+    """Run the regex extractors over one email"""
 
     # Log email content for debugging (truncated for privacy)
-    logger.debug(f"Processing email {msg_id} content (first 500 chars): {email_text[:500]}")
-
-    # Enhanced regex patterns for different email formats
-    amount_patterns = [
-        r"\$([0-9,]+\.?[0-9]*)",  # $123.45, $1,234.56, $123
-        r"([0-9,]+\.?[0-9]*)\s*USD",  # 123.45 USD
-        r"Amount:?\s*\$?([0-9,]+\.?[0-9]*)",  # Amount: $123.45
-        r"Total:?\s*\$?([0-9,]+\.?[0-9]*)",  # Total: $123.45
-        r"Charged:?\s*\$?([0-9,]+\.?[0-9]*)",  # Charged: $123.45
-        r"Payment:?\s*\$?([0-9,]+\.?[0-9]*)",  # Payment: $123.45
-        r"(\d+\.\d{2})\s*(?:was|has been)\s*(?:charged|debited)",  # 123.45 was charged
-    ]
-
-    vendor_patterns = [
-        r"from\s+([A-Za-z0-9\s&\-\.]+?)(?:\s+for|\s+on|\s*\$)",  # from VENDOR for/on/$
-        r"at\s+([A-Za-z0-9\s&\-\.]+?)(?:\s+for|\s+on|\s*\$)",  # at VENDOR
-        r"([A-Za-z0-9\s&\-\.]+?)\s*charged",  # VENDOR charged
-        r"Purchase\s+at\s+([A-Za-z0-9\s&\-\.]+)",  # Purchase at VENDOR
-        r"Transaction\s+at\s+([A-Za-z0-9\s&\-\.]+)",  # Transaction at VENDOR
-        r"(?:merchant|seller):\s*([A-Za-z0-9\s&\-\.]+)",  # merchant: VENDOR
-    ]
-
-    date_patterns = [
-        r"on\s+([A-Za-z]{3}\s+[0-9]{1,2},?\s+[0-9]{4})",  # on Jan 15, 2024
-        r"([A-Za-z]{3}\s+[0-9]{1,2},?\s+[0-9]{4})",  # Jan 15, 2024
-        r"([0-9]{1,2}/[0-9]{1,2}/[0-9]{4})",  # 01/15/2024
-        r"([0-9]{4}-[0-9]{2}-[0-9]{2})",  # 2024-01-15
-        r"Date:\s*([A-Za-z]{3}\s+[0-9]{1,2},?\s+[0-9]{4})",  # Date: Jan 15, 2024
-        r"Transaction\s+date:\s*([A-Za-z]{3}\s+[0-9]{1,2},?\s+[0-9]{4})",  # Transaction date: Jan 15, 2024
-    ]
-
-    # Try regex patterns first
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Processing email %s content (first 500 chars): %s", msg_id, email_text[:500]
+        )
+
     extracted_amount = None
     extracted_vendor = None
     extracted_date = None
 
+    active_categories = _active_categories(email_text)
+
     # Extract amount
-    for pattern in amount_patterns:
-        match = re.search(pattern, email_text, re.IGNORECASE)
-        if match:
-            try:
-                amount_str = match.group(1).replace(',', '')
-                extracted_amount = float(amount_str)
-                logger.debug(f"Amount found with pattern '{pattern}': {extracted_amount}")
-                break
-            except (ValueError, IndexError):
-                continue
+    for pattern, amount_str in _category_matches(email_text, "amount", active_categories):
+        try:
+            extracted_amount = float(amount_str.replace(',', ''))
+            logger.debug("Amount found with pattern '%s': %s", pattern, extracted_amount)
+            break
+        except ValueError:
+            continue
 
     # Extract vendor
-    for pattern in vendor_patterns:
-        match = re.search(pattern, email_text, re.IGNORECASE)
-        if match:
-            vendor = match.group(1).strip()
-            if len(vendor) > 2 and not vendor.isdigit():  # Basic validation
-                extracted_vendor = vendor
-                logger.debug(f"Vendor found with pattern '{pattern}': {extracted_vendor}")
-                break
+    for pattern, vendor in _category_matches(email_text, "vendor", active_categories):
+        vendor = vendor.strip()
+        if len(vendor) > 2 and not vendor.isdigit():  # Basic validation
+            extracted_vendor = vendor
+            logger.debug("Vendor found with pattern '%s': %s", pattern, extracted_vendor)
+            break
 
     # Extract date
-    for pattern in date_patterns:
-        match = re.search(pattern, email_text, re.IGNORECASE)
-        if match:
-            extracted_date = match.group(1)
-            logger.debug(f"Date found with pattern '{pattern}': {extracted_date}")
-            break
+    for pattern, extracted_date in _category_matches(email_text, "date", active_categories):
+        logger.debug("Date found with pattern '%s': %s", pattern, extracted_date)
+        break
+
+    return {
+        'amount': extracted_amount,
+        'vendor': extracted_vendor,
+        'date': extracted_date,
+    }
+
+
+def _needs_ai(extracted, email_text):
+    """Ask the AI only when regex extraction is incomplete for a likely transaction.
+
+    Emails without any currency or amount-looking token are treated as
+    non-transactional and never sent to the provider.
+    """
+    if extracted['amount'] and extracted['vendor']:
+        return False
+    return AMOUNT_HINT_RE.search(email_text) is not None
+
+
+def _merge_ai_result(extracted, ai_result):
+    """Fill fields the regexes missed from an AI extraction result"""
+    if not extracted['amount'] and ai_result.get('amount'):
+        extracted['amount'] = ai_result['amount']
+        logger.info("AI extracted amount: %s", extracted['amount'])
+
+    if not extracted['vendor'] and ai_result.get('vendor'):
+        extracted['vendor'] = ai_result['vendor']
+        logger.info("AI extracted vendor: %s", extracted['vendor'])
+
+    if not extracted['date'] and ai_result.get('date'):
+        extracted['date'] = ai_result['date']
+        logger.info("AI extracted date: %s", extracted['date'])
+
+
+def extract_transaction_data(user, email_text, msg_id):
+    """Enhanced transaction data extraction with multiple patterns and AI fallback"""
+    extracted = _extract_with_patterns(email_text, msg_id)
 
     # If regex extraction failed, try AI extraction
-    if not extracted_amount or not extracted_vendor:
+    if _needs_ai(extracted, email_text):
         try:
-            logger.info(f"Regex extraction incomplete for {msg_id}, trying AI extraction")
-            ai_result = extract_with_ai(user, email_text)
+            logger.info("Regex extraction incomplete for %s, trying AI extraction", msg_id)
+            _merge_ai_result(extracted, extract_with_ai(user, email_text))
+        except Exception as e:
+            logger.error("AI extraction failed for %s: %s", msg_id, e)
 
-            if not extracted_amount and ai_result.get('amount'):
-                extracted_amount = ai_result['amount']
-                logger.info(f"AI extracted amount: {extracted_amount}")
+    return extracted
 
-            if not extracted_vendor and ai_result.get('vendor'):
-                extracted_vendor = ai_result['vendor']
-                logger.info(f"AI extracted vendor: {extracted_vendor}")
 
-            if not extracted_date and ai_result.get('date'):
-                extracted_date = ai_result['date']
-                logger.info(f"AI extracted date: {extracted_date}")
+def _is_recoverable_ai_error(error):
+    """Check whether a provider error is transient (timeout, 429, 5xx)"""
+    error = str(error).lower()
+    return any(fragment in error for fragment in RECOVERABLE_AI_ERRORS)
 
+
+def perform_task_with_backoff(provider, prompt):
+    """Call provider.perform_task, retrying transient failures with jittered backoff"""
+    for attempt in range(AI_MAX_RETRIES + 1):
+        try:
+            result = provider.perform_task(prompt)
+            error = result.get("error") if isinstance(result, dict) else None
         except Exception as e:
-            logger.error(f"AI extraction failed for {msg_id}: {e}")
+            result, error = None, e
+            if not _is_recoverable_ai_error(e) or attempt == AI_MAX_RETRIES:
+                raise
 
-    return {
-        'amount': extracted_amount,
-        'vendor': extracted_vendor,
-        'date': extracted_date
-    }
+        if not error or not _is_recoverable_ai_error(error) or attempt == AI_MAX_RETRIES:
+            return result
+
+        delay = min(AI_BACKOFF_CAP, 2 ** attempt * (1 + random.random() * AI_BACKOFF_JITTER))
+        logger.warning("Transient AI provider error (%s), retrying in %.1fs", error, delay)
+        time.sleep(delay)
+
+
+@lru_cache(maxsize=256)
+def _build_ai_provider(user_id, settings_version):
+    """Construct the AI provider once per (user, profile revision)"""
+    return ai_service.get_ai_provider(User.objects.get(id=user_id))
+
+
+def get_cached_ai_provider(user):
+    """Return the user's AI provider, reusing it across emails in a sync run.
+
+    The profile's `updated_at` is part of the cache key so a change to the
+    user's AI settings builds a fresh provider.
+    """
+    settings_version = (
+        UserProfile.objects.filter(user=user)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+    return _build_ai_provider(user.id, settings_version)
+
+
+def _prompt_window(email_text):
+    """Return up to AI_PROMPT_TEXT_LIMIT characters around the first amount token.
+
+    Receipts often open with navigation and header boilerplate, so the window
+    is centred on the transactional line rather than the start of the email.
+    """
+    hint = AMOUNT_HINT_RE.search(email_text)
+    start = max(0, hint.start() - AI_PROMPT_LEAD_CHARS) if hint else 0
+    return email_text[start:start + AI_PROMPT_TEXT_LIMIT]
+
+
+def _normalize_ai_amount(result):
+    """Validate and convert the amount in an AI extraction result"""
+    if result.get('amount'):
+        try:
+            result['amount'] = float(str(result['amount']).replace(',', ''))
+        except (ValueError, TypeError):
+            result['amount'] = None
 
 
 def extract_with_ai(user, email_text):
     """Use AI service to extract transaction data from email text"""
-    try:
-        # Check if user has credits for AI processing
-        has_credits, message = ai_service.check_user_credits(user, 'bill_parsing')
-        if not has_credits:
-            logger.warning(f"User {user.id} has insufficient credits for AI parsing: {message}")
-            return {}
+    # Reserve credits up front; a single conditional UPDATE avoids a
+    # check-then-consume race between concurrent sync tasks
+    if not ai_service.reserve_credits(user, 'bill_parsing'):
+        logger.warning("User %s has insufficient credits for AI parsing", user.id)
+        return {}
 
+    try:
         # Get AI provider
-        provider = ai_service.get_ai_provider(user)
+        provider = get_cached_ai_provider(user)
         if not provider:
-            logger.error(f"No AI provider available for user {user.id}")
+            logger.error("No AI provider available for user %s", user.id)
+            ai_service.refund_credits(user, 'bill_parsing')
             return {}
 
         # Prepare prompt for transaction extraction
+        truncated_text = _prompt_window(email_text)
         prompt = f"""
 Extract transaction information from this email text. Return a JSON object with:
 - amount: numerical value (float) of the transaction amount
@@ -174,71 +353,72 @@ Extract transaction information from this email text. Return a JSON object with:
 If any field cannot be determined, use null.
 
 Email text:
-{email_text[:1500]}
+{truncated_text}
 
 Return only valid JSON:
 """
 
         # Call AI service
-        result = provider.perform_task(prompt)
-        response = result.get('text', '') if isinstance(result, dict) else str(result)
+        try:
+            result = perform_task_with_backoff(provider, prompt)
+        except Exception:
+            ai_service.refund_credits(user, 'bill_parsing')
+            raise
+
+        if isinstance(result, dict) and result.get('success') is False:
+            logger.error("AI provider failed for user %s: %s", user.id, result.get('error'))
+            ai_service.refund_credits(user, 'bill_parsing')
+            return {}
 
-        # Consume credits
-        ai_service.consume_credits(user, 'bill_parsing')
+        response = result.get('text', '') if isinstance(result, dict) else str(result)
 
         # Parse AI response
         try:
-            # Try to extract JSON from response
+            # Decode the first JSON object in the response in a single pass
             json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                result = json.loads(json_str)
-
-                # Validate and convert amount
-                if result.get('amount'):
-                    try:
-                        result['amount'] = float(str(result['amount']).replace(',', ''))
-                    except (ValueError, TypeError):
-                        result['amount'] = None
-
-                return result
-            else:
-                logger.error(f"No valid JSON found in AI response: {response}")
+            if json_start < 0:
+                logger.error("No valid JSON found in AI response: %s", response)
+                return {}
+
+            result, _ = JSON_DECODER.raw_decode(response, json_start)
+            if not isinstance(result, dict):
+                logger.error("No valid JSON found in AI response: %s", response)
                 return {}
 
+            _normalize_ai_amount(result)
+            return result
+
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI response as JSON: {e}, Response: {response}")
+            logger.error("Failed to parse AI response as JSON: %s, Response: %s", e, response)
             return {}
 
     except Exception as e:
-        logger.error(f"AI extraction error: {e}")
+        logger.error("AI extraction error: %s", e)
         return {}
 
 
 @shared_task
 def sync_all_gmail_accounts():
     """Periodic task to sync emails for all active Gmail accounts"""
-    active_accounts = GmailAccount.objects.filter(is_active=True)
+    active_accounts = list(
+        GmailAccount.objects.filter(is_active=True).values_list("id", "email")
+    )
 
-    if not active_accounts.exists():
+    if not active_accounts:
         logger.info("No active Gmail accounts found for email sync")
         return {"message": "No active accounts", "accounts_processed": 0}
 
-    logger.info(f"Starting email sync for {active_accounts.count()} active Gmail accounts")
-
-    results = {"accounts_processed": 0, "accounts_failed": 0}
+    logger.info("Starting email sync for %s active Gmail accounts", len(active_accounts))
 
-    for account in active_accounts:
-        try:
-            logger.info(f"Triggering email sync for account {account.id} ({account.email})")
-            sync_gmail_account.delay(account.id)
-            results["accounts_processed"] += 1
-        except Exception as e:
-            logger.error(f"Failed to trigger email sync for account {account.id}: {e}")
-            results["accounts_failed"] += 1
+    # Publish every sync task in a single group instead of one delay() per account
+    try:
+        group(sync_gmail_account.s(account_id) for account_id, _ in active_accounts).apply_async()
+        results = {"accounts_processed": len(active_accounts), "accounts_failed": 0}
+    except Exception as e:
+        logger.error("Failed to trigger email sync for %s accounts: %s", len(active_accounts), e)
+        results = {"accounts_processed": 0, "accounts_failed": len(active_accounts)}
 
-    logger.info(f"Email sync tasks queued: {results}")
+    logger.info("Email sync tasks queued: %s", results)
     return results
 
 
@@ -246,4 +426,4 @@ def sync_all_gmail_accounts():
 @shared_task
 def sync_all_user_emails():
     """DEPRECATED: Use sync_all_gmail_accounts instead"""
-    return sync_all_gmail_accounts()
\ No newline at end of file
+    return sync_all_gmail_accounts()
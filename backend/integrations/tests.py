@@ -0,0 +1,77 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from integrations.services.bank_import_service import BankImportService
+from integrations.tasks import _extract_with_patterns, _merge_ai_result
+
+User = get_user_model()
+
+
+class EmailDateExtractionTests(SimpleTestCase):
+    def test_each_date_pattern_captures_its_layout(self):
+        """
+        Ensure every date layout in DATE_PATTERNS is picked up from an email.
+        """
+        samples = {
+            "Your order shipped on Jan 15, 2024": "Jan 15, 2024",
+            "Statement Feb 3 2024 is ready": "Feb 3 2024",
+            "Posted 01/15/2024": "01/15/2024",
+            "Posted 2024-01-15": "2024-01-15",
+            "Date: Mar 9, 2024": "Mar 9, 2024",
+        }
+        for email_text, expected in samples.items():
+            with self.subTest(email_text=email_text):
+                self.assertEqual(_extract_with_patterns(email_text, "msg")["date"], expected)
+
+    def test_full_extraction(self):
+        """
+        Ensure amount, vendor and date come out of one transaction email.
+        """
+        extracted = _extract_with_patterns(
+            "Payment $1,234.50 at Corner Store on Jan 15, 2024", "msg"
+        )
+        self.assertEqual(extracted["amount"], 1234.5)
+        self.assertEqual(extracted["vendor"], "Corner Store")
+        self.assertEqual(extracted["date"], "Jan 15, 2024")
+
+    def test_ai_result_only_fills_missing_fields(self):
+        """
+        Ensure the AI fallback never overrides what the regexes found.
+        """
+        extracted = _extract_with_patterns("Charged $20.00 on Jan 15, 2024", "msg")
+        _merge_ai_result(
+            extracted, {"amount": 99.0, "vendor": "Cafe", "date": "2024-02-01"}
+        )
+        self.assertEqual(extracted["amount"], 20.0)
+        self.assertEqual(extracted["vendor"], "Cafe")
+        self.assertEqual(extracted["date"], "Jan 15, 2024")
+
+        extracted = _extract_with_patterns("no details here", "msg")
+        _merge_ai_result(extracted, {"date": "2024-02-01"})
+        self.assertEqual(extracted["date"], "2024-02-01")
+
+
+class BankImportDateTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="importer", password="password123")
+        self.service = BankImportService(user)
+
+    def test_parse_date_formats(self):
+        """
+        Ensure ISO dates take the fast path and other layouts still parse.
+        """
+        samples = {
+            "2024-01-15": date(2024, 1, 15),
+            "01/15/2024": date(2024, 1, 15),
+            "15/01/2024": date(2024, 1, 15),
+            "2024/01/15": date(2024, 1, 15),
+        }
+        for value, expected in samples.items():
+            with self.subTest(value=value):
+                self.assertEqual(self.service._parse_date(value), expected)
+
+    def test_unparseable_date_raises(self):
+        with self.assertRaises(ValueError):
+            self.service._parse_date("2024-13-45")
@@ -2,12 +2,19 @@
 Views for integrations app - Gmail OAuth and account management.
 """
 
+import base64
+import hashlib
+import json
+import logging
 import os
+from celery import group
 from rest_framework import views, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from .models import GmailAccount
@@ -15,37 +22,89 @@ from .serializers import GoogleAccountSerializer
 from .services.currency_service import CurrencyService
 from .constants import SUPPORTED_CURRENCIES
 
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Google OAuth client settings shared by the connect and callback views
+OAUTH_CLIENT_CONFIG = {
+    "web": {
+        "client_id": settings.GOOGLE_OAUTH_CLIENT_ID,
+        "client_secret": settings.GOOGLE_OAUTH_CLIENT_SECRET,
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "redirect_uris": [settings.GOOGLE_OAUTH_REDIRECT_URI],
+    }
+}
+OAUTH_SCOPES = [
+    "https://www.googleapis.com/auth/gmail.readonly",
+    "https://www.googleapis.com/auth/userinfo.email",
+    "https://www.googleapis.com/auth/userinfo.profile",
+    "openid",
+]
+
+# Signed cookie carrying the OAuth state between the connect and callback views
+OAUTH_STATE_COOKIE = "gmail_oauth_state"
+OAUTH_STATE_SALT = "gmail-oauth"
+OAUTH_STATE_MAX_AGE = 600
+
+# OAuth token columns the account views never serialize
+TOKEN_FIELDS = ("access_token", "refresh_token", "expires_at")
+
+# Gmail account settings a user may change through the detail view
+EDITABLE_ACCOUNT_FIELDS = (
+    "name",
+    "transaction_tag",
+    "sender_filters",
+    "keyword_filters",
+    "is_active",
+)
+
+# The supported currency list is static, so its response body is built once
+SUPPORTED_CURRENCIES_PAYLOAD = {
+    'currencies': SUPPORTED_CURRENCIES,
+    'count': len(SUPPORTED_CURRENCIES),
+}
+SUPPORTED_CURRENCIES_ETAG = '"%s"' % hashlib.md5(
+    json.dumps(SUPPORTED_CURRENCIES, sort_keys=True).encode()
+).hexdigest()
+SUPPORTED_CURRENCIES_MAX_AGE = 60 * 60 * 24
+
+# Exchange rates change slowly; clients may reuse a stale copy while refreshing
+EXCHANGE_RATES_MAX_AGE = 300
+EXCHANGE_RATES_STALE_WHILE_REVALIDATE = 600
+
 # Allow insecure transport for development (OAuth over HTTP)
 if settings.DEBUG:
     os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
 
+def email_from_id_token(id_token):
+    """Read the email claim from an ID token returned by Google's token endpoint.
+
+    The token arrives directly from Google over TLS, which OpenID Connect
+    accepts in place of verifying its signature.
+    """
+    try:
+        payload = id_token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (AttributeError, IndexError, ValueError):
+        return None
+    return claims.get("email") if isinstance(claims, dict) else None
+
+
 class GmailConnectView(views.APIView):
     """Initiate Gmail OAuth flow"""
 
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Debug: Print the redirect URI being used
-        print(f"DEBUG: Using redirect URI: {settings.GOOGLE_OAUTH_REDIRECT_URI}")
+        logger.debug("Using redirect URI: %s", settings.GOOGLE_OAUTH_REDIRECT_URI)
 
         # Create flow instance to manage OAuth 2.0 Authorization Grant Flow steps.
         flow = Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": settings.GOOGLE_OAUTH_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_OAUTH_CLIENT_SECRET,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token",
-                    "redirect_uris": [settings.GOOGLE_OAUTH_REDIRECT_URI],
-                }
-            },
-                       scopes=[
-                "https://www.googleapis.com/auth/userinfo.email",
-                "https://www.googleapis.com/auth/userinfo.profile",
-                "https://www.googleapis.com/auth/gmail.readonly",
-                "openid"
-            ],
+            OAUTH_CLIENT_CONFIG,
+            scopes=OAUTH_SCOPES,
             redirect_uri=settings.GOOGLE_OAUTH_REDIRECT_URI,
         )
 
@@ -58,13 +117,21 @@ class GmailConnectView(views.APIView):
             prompt="consent"  # Force consent screen to get refresh token
         )
 
-        # Debug: Print the generated authorization URL
-        print(f"DEBUG: Generated authorization URL: {authorization_url}")
-
-        # Store state in session for verification
-        request.session["gmail_oauth_state"] = state
-
-        return Response({"authorization_url": authorization_url, "state": state})
+        logger.debug("Generated authorization URL: %s", authorization_url)
+
+        # Carry the state in a signed cookie so the callback can reject a bad
+        # state without loading the session
+        response = Response({"authorization_url": authorization_url, "state": state})
+        response.set_signed_cookie(
+            OAUTH_STATE_COOKIE,
+            state,
+            salt=OAUTH_STATE_SALT,
+            max_age=OAUTH_STATE_MAX_AGE,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite="Lax",
+        )
+        return response
 
 
 class GmailCallbackView(views.APIView):
@@ -77,20 +144,21 @@ class GmailCallbackView(views.APIView):
     def get(self, request):
         # Verify state parameter
         state = request.GET.get("state")
-        stored_state = request.session.get("gmail_oauth_state")
+        stored_state = request.get_signed_cookie(
+            OAUTH_STATE_COOKIE,
+            default=None,
+            salt=OAUTH_STATE_SALT,
+            max_age=OAUTH_STATE_MAX_AGE,
+        )
 
-        # Debug logging
-        print(f"DEBUG: Received state: {state}")
-        print(f"DEBUG: Stored state: {stored_state}")
-        print(f"DEBUG: Session keys: {list(request.session.keys())}")
+        logger.debug("Received state: %s, stored state: %s", state, stored_state)
 
-        if state != stored_state:
+        if not state or state != stored_state:
             return Response(
                 {
                     "error": "Invalid state parameter",
                     "received_state": state,
                     "stored_state": stored_state,
-                    "session_keys": list(request.session.keys())
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -105,21 +173,8 @@ class GmailCallbackView(views.APIView):
 
         # Exchange authorization code for tokens
         flow = Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": settings.GOOGLE_OAUTH_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_OAUTH_CLIENT_SECRET,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token",
-                    "redirect_uris": [settings.GOOGLE_OAUTH_REDIRECT_URI],
-                }
-            },
-            scopes= [
-        "https://www.googleapis.com/auth/gmail.readonly",
-        "https://www.googleapis.com/auth/userinfo.email",
-        "https://www.googleapis.com/auth/userinfo.profile",
-        "openid"
-        ],
+            OAUTH_CLIENT_CONFIG,
+            scopes=OAUTH_SCOPES,
             redirect_uri=settings.GOOGLE_OAUTH_REDIRECT_URI,
             state=state,
         )
@@ -127,40 +182,48 @@ class GmailCallbackView(views.APIView):
         authorization_response = request.build_absolute_uri()
         flow.fetch_token(authorization_response=authorization_response)
 
-        # Get user info from Google
-        service = build("gmail", "v1", credentials=flow.credentials)
-        profile = service.users().getProfile(userId="me").execute()
+        # The ID token from the exchange already names the account, which saves
+        # a Gmail profile round-trip; fall back to the API if it is missing
+        email = email_from_id_token(flow.credentials.id_token)
+        if not email:
+            service = build("gmail", "v1", credentials=flow.credentials)
+            email = service.users().getProfile(userId="me").execute()["emailAddress"]
 
         # Save or update GoogleAccount
         try:
-            from django.contrib.auth import get_user_model
-
-            User = get_user_model()
             user = User.objects.get(id=user_id)
 
             # Warn if no refresh token (shouldn't happen with prompt=consent)
             if not flow.credentials.refresh_token:
-                print(f"WARNING: No refresh token received for {profile['emailAddress']}")
-                print("This will prevent automatic email syncing. User may need to reconnect.")
+                logger.warning(
+                    "No refresh token received for %s; automatic email syncing will "
+                    "not work until the user reconnects",
+                    email,
+                )
+
+            defaults = {
+                "name": f"Gmail ({email})",
+                "access_token": flow.credentials.token,
+                "expires_at": flow.credentials.expiry,
+            }
+            # Keep the stored refresh token when Google does not issue a new one
+            if flow.credentials.refresh_token:
+                defaults["refresh_token"] = flow.credentials.refresh_token
 
             gmail_account, created = GmailAccount.objects.update_or_create(
                 user=user,
-                email=profile["emailAddress"],
-                defaults={
-                    "name": f"Gmail ({profile['emailAddress']})",
-                    "access_token": flow.credentials.token,
-                    "refresh_token": flow.credentials.refresh_token or "",
-                    "expires_at": flow.credentials.expiry,
-                },
+                email=email,
+                defaults=defaults,
             )
 
             # Clean up session
-            del request.session["gmail_oauth_user_id"]
-            del request.session["gmail_oauth_state"]
+            request.session.pop("gmail_oauth_user_id", None)
 
             # Redirect to frontend Gmail callback page
             frontend_url = settings.CORS_ALLOWED_ORIGINS[0]
-            return redirect(f"{frontend_url}/gmail-callback?success=true&email={profile['emailAddress']}")
+            response = redirect(f"{frontend_url}/gmail-callback?success=true&email={email}")
+            response.delete_cookie(OAUTH_STATE_COOKIE, samesite="Lax")
+            return response
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -173,7 +236,9 @@ class GmailAccountListView(views.APIView):
 
     def get(self, request):
         """Get all Gmail accounts for user"""
-        gmail_accounts = GmailAccount.objects.filter(user=request.user)
+        gmail_accounts = list(
+            GmailAccount.objects.filter(user=request.user).defer(*TOKEN_FIELDS)
+        )
         serializer = GoogleAccountSerializer(gmail_accounts, many=True)
         return Response({"accounts": serializer.data, "count": len(gmail_accounts)})
 
@@ -183,12 +248,14 @@ class GmailAccountDetailView(views.APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_account(self, request, account_id):
-        """Get specific Gmail account"""
-        try:
-            return GmailAccount.objects.get(id=account_id, user=request.user)
-        except GmailAccount.DoesNotExist:
-            return None
+    def get_account(self, request, account_id, fields=None):
+        """Get specific Gmail account, loading only `fields` when given"""
+        queryset = GmailAccount.objects.filter(id=account_id, user=request.user)
+        if fields:
+            queryset = queryset.only(*fields)
+        else:
+            queryset = queryset.defer(*TOKEN_FIELDS)
+        return queryset.first()
 
     def get(self, request, account_id):
         """Get specific Gmail account details"""
@@ -211,26 +278,20 @@ class GmailAccountDetailView(views.APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Update account settings
-        if "name" in request.data:
-            account.name = request.data["name"]
-        if "transaction_tag" in request.data:
-            account.transaction_tag = request.data["transaction_tag"]
-        if "sender_filters" in request.data:
-            account.sender_filters = request.data["sender_filters"]
-        if "keyword_filters" in request.data:
-            account.keyword_filters = request.data["keyword_filters"]
-        if "is_active" in request.data:
-            account.is_active = request.data["is_active"]
+        # Update account settings, writing only the columns that changed
+        changed_fields = [field for field in EDITABLE_ACCOUNT_FIELDS if field in request.data]
+        for field in changed_fields:
+            setattr(account, field, request.data[field])
 
-        account.save()
+        if changed_fields:
+            account.save(update_fields=changed_fields + ["updated_at"])
 
         serializer = GoogleAccountSerializer(account)
         return Response(serializer.data)
 
     def delete(self, request, account_id):
         """Delete Gmail account"""
-        account = self.get_account(request, account_id)
+        account = self.get_account(request, account_id, fields=("id",))
         if not account:
             return Response(
                 {"error": "Gmail account not found"},
@@ -253,7 +314,9 @@ class GmailSyncView(views.APIView):
 
             if account_id:
                 # Sync specific account
-                account = GmailAccount.objects.get(id=account_id, user=request.user)
+                account = GmailAccount.objects.only("id", "email").get(
+                    id=account_id, user=request.user
+                )
                 result = sync_gmail_account.delay(account.id)
                 return Response({
                     "message": f"Email sync started for account {account.email}",
@@ -261,17 +324,24 @@ class GmailSyncView(views.APIView):
                 })
             else:
                 # Sync all user's accounts
-                user_accounts = GmailAccount.objects.filter(user=request.user, is_active=True)
-                if not user_accounts.exists():
+                account_ids = list(
+                    GmailAccount.objects.filter(user=request.user, is_active=True)
+                    .values_list("id", flat=True)
+                )
+                if not account_ids:
                     return Response(
                         {"error": "No active Gmail accounts found"},
                         status=status.HTTP_404_NOT_FOUND
                     )
 
-                task_ids = []
-                for account in user_accounts:
-                    result = sync_gmail_account.delay(account.id)
-                    task_ids.append({"account_id": account.id, "task_id": result.id})
+                # One broker publish for every account instead of a delay() each
+                group_result = group(
+                    sync_gmail_account.s(account_id) for account_id in account_ids
+                ).apply_async()
+                task_ids = [
+                    {"account_id": account_id, "task_id": result.id}
+                    for account_id, result in zip(account_ids, group_result.children)
+                ]
 
                 return Response({
                     "message": f"Email sync started for {len(task_ids)} accounts",
@@ -313,10 +383,14 @@ class GmailConnectionTestView(views.APIView):
 @permission_classes([permissions.IsAuthenticated])
 def get_supported_currencies(request):
     """Get list of supported currencies with their symbols and names."""
-    return Response({
-        'currencies': SUPPORTED_CURRENCIES,
-        'count': len(SUPPORTED_CURRENCIES)
-    }, status=status.HTTP_200_OK)
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if SUPPORTED_CURRENCIES_ETAG in (tag.strip() for tag in if_none_match.split(",")):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(SUPPORTED_CURRENCIES_PAYLOAD, status=status.HTTP_200_OK)
+    response["ETag"] = SUPPORTED_CURRENCIES_ETAG
+    patch_cache_control(response, public=True, max_age=SUPPORTED_CURRENCIES_MAX_AGE)
+    return response
 
 
 @api_view(['GET'])
@@ -329,10 +403,16 @@ def get_exchange_rates(request):
     rates = currency_service.get_all_rates(base_currency)
 
     if rates:
-        return Response({
+        response = Response({
             'base_currency': base_currency,
             'rates': rates,
         }, status=status.HTTP_200_OK)
+        patch_cache_control(
+            response,
+            max_age=EXCHANGE_RATES_MAX_AGE,
+            stale_while_revalidate=EXCHANGE_RATES_STALE_WHILE_REVALIDATE,
+        )
+        return response
     else:
         return Response({
             'error': f'Unable to fetch exchange rates for {base_currency}'
@@ -361,14 +441,22 @@ def convert_currency(request):
             'error': 'Amount must be a valid number'
         }, status=status.HTTP_400_BAD_REQUEST)
 
+    if from_currency == to_currency:
+        return Response({
+            'from_currency': from_currency,
+            'to_currency': to_currency,
+            'original_amount': amount,
+            'converted_amount': amount,
+            'exchange_rate': 1.0,
+        }, status=status.HTTP_200_OK)
+
     currency_service = CurrencyService()
     from decimal import Decimal
-    converted_amount = currency_service.convert_amount(
+    converted_amount, exchange_rate = currency_service.convert_amount_with_rate(
         Decimal(str(amount)), from_currency, to_currency
     )
 
     if converted_amount is not None:
-        exchange_rate = currency_service.get_exchange_rate(from_currency, to_currency)
         return Response({
             'from_currency': from_currency,
             'to_currency': to_currency,
@@ -42,19 +42,27 @@ def load_fixtures(flush_db=False):
 
     print("🔄 Loading fixtures...")
 
+    fixture_paths = []
+    for fixture in fixtures:
+        fixture_path = os.path.join(os.path.dirname(__file__), fixture)
+        if os.path.exists(fixture_path):
+            print(f"  📂 Loading {fixture}...")
+            fixture_paths.append(fixture_path)
+        else:
+            print(f"  ⚠️  Fixture not found: {fixture_path}")
+
+    if not fixture_paths:
+        print("  ⚠️  No fixtures to load")
+        return
+
+    # One loaddata call deserializes every fixture in a single pass and transaction
     with transaction.atomic():
-        for fixture in fixtures:
-            fixture_path = os.path.join(os.path.dirname(__file__), fixture)
-            if os.path.exists(fixture_path):
-                print(f"  📂 Loading {fixture}...")
-                try:
-                    call_command("loaddata", fixture_path)
-                    print(f"  ✅ Loaded {fixture}")
-                except Exception as e:
-                    print(f"  ❌ Error loading {fixture}: {e}")
-                    raise
-            else:
-                print(f"  ⚠️  Fixture not found: {fixture_path}")
+        try:
+            call_command("loaddata", *fixture_paths, ignorenonexistent=True)
+            print(f"  ✅ Loaded {len(fixture_paths)} fixtures")
+        except Exception as e:
+            print(f"  ❌ Error loading fixtures: {e}")
+            raise
 
     print("\n🎉 All fixtures loaded successfully!")
     print("\n📊 Sample data includes:")
@@ -0,0 +1,54 @@
+from django.db import DatabaseError, migrations, models, transaction
+
+
+def compress_body_html(apps, schema_editor):
+    # lz4 TOAST compression (PostgreSQL 14+) is much cheaper than the
+    # default pglz for the large HTML bodies stored here
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql" or connection.pg_version < 140000:
+        return
+    try:
+        # Servers built without lz4 reject the method; the savepoint keeps
+        # that from aborting the rest of the migration, which stays on pglz
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute(
+                "ALTER TABLE training_rawemail ALTER COLUMN body_html SET COMPRESSION lz4"
+            )
+    except DatabaseError:
+        pass
+
+
+def reset_body_html_compression(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql" or connection.pg_version < 140000:
+        return
+    schema_editor.execute(
+        "ALTER TABLE training_rawemail ALTER COLUMN body_html SET COMPRESSION default"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("training", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="rawemail",
+            name="subject",
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name="rawemail",
+            name="sender",
+            field=models.TextField(),
+        ),
+        migrations.AddIndex(
+            model_name="rawemail",
+            index=models.Index(
+                fields=["user", "-received_at"], name="rawemail_user_received_idx"
+            ),
+        ),
+        migrations.RunPython(compress_body_html, reset_body_html_compression),
+    ]
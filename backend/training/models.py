@@ -19,12 +19,18 @@ class RawEmail(models.Model):
     )                                                                                                             
     message_id = models.CharField(max_length=255, unique=True)                                                    
     headers = models.JSONField(default=dict)                                                                      
-    subject = models.CharField(max_length=1000)                                                                   
-    sender = models.CharField(max_length=1000)                                                                    
+    subject = models.TextField()
+    sender = models.TextField()
     body_text = models.TextField(blank=True)                                                                      
     body_html = models.TextField(blank=True)                                                                      
     received_at = models.DateTimeField()                                                                          
     created_at = models.DateTimeField(auto_now_add=True)                                                          
+
+    class Meta:
+        indexes = [
+            # Training data is pulled per user, newest first
+            models.Index(fields=["user", "-received_at"], name="rawemail_user_received_idx"),
+        ]
                                                                                                                   
     def __str__(self):                                                                                            
         return f"Email from {self.sender} to {self.user.email} - {self.subject}"   
\ No newline at end of file
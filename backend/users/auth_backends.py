@@ -1,11 +1,40 @@
+import hashlib
+import time
+
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import user_cache_key
 
 User = get_user_model()
 
+# Verified access tokens are remembered until they expire, at most this long
+TOKEN_CACHE_MAX_TIMEOUT = 3600
+
+# Users resolved for cached tokens are reused this long; saving a user evicts it
+USER_CACHE_TIMEOUT = 300
+
+
+def token_cache_key(raw_token):
+    """Cache key for a verified access token, without storing the token itself"""
+    return "jwt:" + hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+def get_cached_user(user_id):
+    """Return the User for user_id, reusing the shared user cache.
+
+    Raises User.DoesNotExist when there is no such user.
+    """
+    user = cache.get(user_cache_key(user_id))
+    if user is None:
+        user = User.objects.get(id=user_id)
+        cache.set(user_cache_key(user_id), user, USER_CACHE_TIMEOUT)
+    return user
+
 
 class CookieJWTAuthentication(BaseAuthentication):
     """
@@ -19,15 +48,28 @@ class CookieJWTAuthentication(BaseAuthentication):
         if not raw_token:
             return None
 
+        # A token verified earlier only needs decoding, not signature checks
+        key = token_cache_key(raw_token)
+        if cache.get(key) is not None:
+            try:
+                validated_token = UntypedToken(raw_token, verify=False)
+                return (self.get_user(validated_token), validated_token)
+            except (InvalidToken, TokenError):
+                cache.delete(key)
+
         try:
             # Validate the token
             validated_token = UntypedToken(raw_token)
             user = self.get_user(validated_token)
-            return (user, validated_token)
-
         except (InvalidToken, TokenError) as e:
             raise AuthenticationFailed(f"Invalid token: {str(e)}")
 
+        timeout = min(int(validated_token["exp"] - time.time()), TOKEN_CACHE_MAX_TIMEOUT)
+        if timeout > 0:
+            cache.set(key, user.id, timeout)
+
+        return (user, validated_token)
+
     def get_user(self, validated_token):
         """
         Get the user associated with the token
@@ -40,7 +82,7 @@ class CookieJWTAuthentication(BaseAuthentication):
             )
 
         try:
-            user = User.objects.get(id=user_id)
+            user = get_cached_user(user_id)
         except User.DoesNotExist:
             raise AuthenticationFailed("User not found")
 
@@ -1,5 +1,6 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 
 User = get_user_model()
 
@@ -10,24 +11,25 @@ class EmailBackend(ModelBackend):
     """
 
     def authenticate(self, request, username=None, password=None, **kwargs):
-        # Always try email first, then fall back to username
-        if username:
-            if "@" in username:
-                # Definitely an email
-                try:
-                    user = User.objects.get(email=username)
-                except User.DoesNotExist:
-                    return None
-            else:
-                # Could be username, try email first (in case user provided email without @)
-                try:
-                    user = User.objects.get(email=username)
-                except User.DoesNotExist:
-                    # Fall back to username
-                    try:
-                        user = User.objects.get(username=username)
-                    except User.DoesNotExist:
-                        return None
+        if not username or password is None:
+            return None
+
+        # Email always wins; usernames are only tried for values without "@".
+        # Both candidates come back in a single query.
+        if "@" in username:
+            candidates = User.objects.filter(email=username)
+        else:
+            candidates = User.objects.filter(Q(email=username) | Q(username=username))
+
+        user = None
+        for candidate in candidates[:2]:
+            if candidate.email == username:
+                user = candidate
+                break
+            user = candidate
+
+        if user is None:
+            return None
 
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
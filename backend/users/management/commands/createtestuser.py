@@ -0,0 +1,50 @@
+"""
+Management command to create a test user for profile photo testing
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Create a test user for profile photo testing if it doesn't exist"
+
+    email = "test@example.com"
+    password = "testpassword123"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Check if user already exists
+            user = User.objects.filter(email=self.email).first()
+            if user is not None:
+                self.stdout.write(self.style.SUCCESS(f"Test user already exists: {user.email}"))
+                # Create user profile if it doesn't exist
+                profile, created = UserProfile.objects.get_or_create(user=user)
+            else:
+                # Create new user
+                user = User.objects.create_user(
+                    username=self.email,
+                    email=self.email,
+                    password=self.password,
+                    first_name="Test",
+                    last_name="User",
+                )
+                self.stdout.write(self.style.SUCCESS(f"Created test user: {user.email}"))
+                # A brand-new user has no profile yet, so skip the lookup
+                profile, created = UserProfile.objects.create(user=user), True
+
+            if created:
+                self.stdout.write(self.style.SUCCESS("Created user profile"))
+            else:
+                self.stdout.write(self.style.SUCCESS("User profile already exists"))
+
+        self.stdout.write(f"Email: {self.email}")
+        self.stdout.write(f"Password: {self.password}")
+        self.stdout.write(
+            "\nYou can now use these credentials to test the profile photo functionality!"
+        )
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_userprofile_profile_photo_and_more"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="activitylog",
+            name="users_activ_user_id_67fad2_idx",
+        ),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["user", "activity_type", "-created_at"],
+                name="actlog_user_type_ctd_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="plan",
+            name="users_plan_plan_ty_4232f9_idx",
+        ),
+        migrations.AddIndex(
+            model_name="plan",
+            index=models.Index(
+                condition=models.Q(is_active=True),
+                fields=["plan_type", "price"],
+                name="plan_active_type_price",
+            ),
+        ),
+    ]
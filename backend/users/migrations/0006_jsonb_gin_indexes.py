@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# GIN indexes on JSON columns only exist on PostgreSQL; the SQLite dev
+# database keeps plain JSON columns, so the indexes are created by vendor
+# check rather than declared in Meta.indexes.
+GIN_INDEXES = [
+    ("plan_features_gin", "users_plan", "features"),
+    ("actlog_details_gin", "users_activitylog", "details"),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table, column in GIN_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+            f"USING gin ({column} jsonb_path_ops)"
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in GIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_activitylog_plan_query_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_jsonb_gin_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="userprofile",
+            name="users_userp_subscri_d28475_idx",
+        ),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                condition=models.Q(subscription_status="active"),
+                fields=["subscription_end_date"],
+                name="profile_active_end_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="plan",
+            index=models.Index(
+                fields=["name"],
+                name="plan_name_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
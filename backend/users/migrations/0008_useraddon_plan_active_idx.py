@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_profile_active_end_plan_name_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="useraddon",
+            index=models.Index(
+                condition=models.Q(is_active=True),
+                fields=["user_plan"],
+                name="useraddon_plan_active_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# UserViewSet.search filters with icontains, which PostgreSQL runs as
+# UPPER(column::text) LIKE UPPER('%...%'). Trigram GIN indexes on those
+# expressions let it skip a sequential scan of auth_user. They only exist on
+# PostgreSQL, so the SQLite dev database is left alone.
+TRIGRAM_INDEXES = [
+    ("auth_user_email_upper_trgm", "email"),
+    ("auth_user_username_upper_trgm", "username"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON auth_user "
+            f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0008_useraddon_plan_active_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count
+
+# Registration relies on the database to reject duplicate emails, so
+# auth_user.email gets a unique index. Blank emails are excluded because
+# accounts created without one share the empty string.
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # Fail with the offending addresses instead of an opaque IntegrityError
+    # from CREATE UNIQUE INDEX; they have to be merged or changed by hand
+    User = apps.get_model("auth", "User")
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias)
+        .exclude(email="")
+        .values("email")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .order_by("email")
+        .values_list("email", "count")
+    )
+    if duplicates:
+        listing = ", ".join(f"{email} ({count} accounts)" for email, count in duplicates)
+        raise RuntimeError(
+            "Cannot add a unique index on auth_user.email; resolve these "
+            f"duplicate emails first: {listing}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0009_user_search_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX IF NOT EXISTS auth_user_email_uniq "
+            "ON auth_user (email) WHERE email <> ''",
+            reverse_sql="DROP INDEX IF EXISTS auth_user_email_uniq",
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0010_user_email_unique_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="profile_photo_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0011_userprofile_profile_photo_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="deletion_requested_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
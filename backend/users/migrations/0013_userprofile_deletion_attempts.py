@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0012_userprofile_deletion_requested_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="deletion_attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -2,13 +2,25 @@
 User-related Django models for authentication, profiles, plans, and activity logging.
 """
 
+from datetime import timedelta
+from functools import cached_property, lru_cache
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from cryptography.fernet import Fernet
 from django.conf import settings
 
 
+@lru_cache(maxsize=1)
+def _get_fernet():
+    """Fernet cipher for profile API keys, built once per process"""
+    return Fernet(settings.SECRET_KEY[:44].encode() + b"==")
+
+
 # ================================
 # BASE MODELS AND MIXINS
 # ================================
@@ -49,6 +61,16 @@ class UserProfile(models.Model):
         ("suspended", "Suspended"),
     ]
 
+    PROFILE_PHOTO_STATUS_CHOICES = [
+        ("processing", "Processing"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
+    # An upload still "processing" after this long lost its task (worker
+    # crash, broker outage) and is reported as failed
+    PROFILE_PHOTO_PROCESSING_TIMEOUT = timedelta(minutes=10)
+
     AI_PROVIDERS = [
         ("system", "System Default"),
         ("openai", "OpenAI"),
@@ -122,6 +144,10 @@ class UserProfile(models.Model):
     # Profile photo (custom uploaded)
     profile_photo = models.ImageField(upload_to='profile_photos/', blank=True, null=True)
     profile_photo_thumbnail = models.ImageField(upload_to='profile_photos/thumbnails/', blank=True, null=True)
+    # Set while an upload is resized in the background; empty until the first upload
+    profile_photo_status = models.CharField(
+        max_length=20, choices=PROFILE_PHOTO_STATUS_CHOICES, blank=True
+    )
 
     # Google OAuth essential data
     google_profile_picture = models.URLField(blank=True, null=True)
@@ -131,13 +157,24 @@ class UserProfile(models.Model):
     onboarding_step = models.PositiveIntegerField(default=0)
     is_onboarded = models.BooleanField(default=False)
 
+    # Set when the user asks to delete their account; the data is removed by
+    # a background task. The sweeper moves the timestamp forward each time it
+    # re-queues the deletion and counts those retries.
+    deletion_requested_at = models.DateTimeField(null=True, blank=True)
+    deletion_attempts = models.PositiveSmallIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["subscription_status"]),
-            models.Index(fields=["subscription_end_date"]),
+            # Expiry sweeps only scan subscriptions that are still active
+            models.Index(
+                fields=["subscription_end_date"],
+                condition=models.Q(subscription_status="active"),
+                name="profile_active_end_idx",
+            ),
         ]
 
     def __str__(self):
@@ -146,20 +183,29 @@ class UserProfile(models.Model):
     def encrypt_api_key(self, api_key):
         """Encrypt API key for storage"""
         try:
-            fernet = Fernet(settings.SECRET_KEY[:44].encode() + b"==")
+            fernet = _get_fernet()
             return fernet.encrypt(api_key.encode()).decode()
         except Exception:
             return api_key  # Fallback to plain text
 
     def decrypt_api_key(self):
-        """Decrypt stored API key"""
+        """Decrypt stored API key.
+
+        The result is memoized on the instance against the ciphertext it came
+        from, so repeated calls skip Fernet and a changed key is re-decrypted.
+        """
         if not self.openai_api_key:
             return None
+        cached = self.__dict__.get("_decrypted_api_key")
+        if cached is not None and cached[0] == self.openai_api_key:
+            return cached[1]
         try:
-            fernet = Fernet(settings.SECRET_KEY[:44].encode() + b"==")
-            return fernet.decrypt(self.openai_api_key.encode()).decode()
+            fernet = _get_fernet()
+            api_key = fernet.decrypt(self.openai_api_key.encode()).decode()
         except Exception:
-            return self.openai_api_key  # Fallback to plain text
+            api_key = self.openai_api_key  # Fallback to plain text
+        self._decrypted_api_key = (self.openai_api_key, api_key)
+        return api_key
 
     def reset_monthly_usage(self):
         """Reset monthly usage counters"""
@@ -182,6 +228,16 @@ class UserProfile(models.Model):
             return True
         return False
 
+    @property
+    def current_profile_photo_status(self):
+        """profile_photo_status, with stale "processing" uploads shown as failed"""
+        if (
+            self.profile_photo_status == "processing"
+            and timezone.now() - self.updated_at > self.PROFILE_PHOTO_PROCESSING_TIMEOUT
+        ):
+            return "failed"
+        return self.profile_photo_status
+
     @property
     def profile_photo_url(self):
         """Get the best available profile photo URL"""
@@ -270,8 +326,19 @@ class Plan(TimestampedModel):
 
     class Meta:
         indexes = [
-            models.Index(fields=["plan_type", "is_active"]),
+            # Plan listings only ever look at active plans
+            models.Index(
+                fields=["plan_type", "price"],
+                condition=models.Q(is_active=True),
+                name="plan_active_type_price",
+            ),
             models.Index(fields=["price"]),
+            # Pattern ops let prefix LIKE lookups on name use the index on PostgreSQL
+            models.Index(
+                fields=["name"],
+                name="plan_name_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
         ]
 
     def __str__(self):
@@ -295,8 +362,31 @@ class UserPlanAssignment(TimestampedModel):
         default=dict
     )  # Combined limits from base + addons
 
-    def calculate_totals(self):
-        """Recalculate total cost and limits"""
+    # Addon columns calculate_totals reads
+    ADDON_TOTALS_FIELDS = (
+        "quantity",
+        "addon__price",
+        "addon__billing_cycle",
+        "addon__ai_credits_per_month",
+        "addon__max_transactions_per_month",
+        "addon__max_accounts",
+        "addon__storage_gb",
+        "addon__features",
+    )
+
+    # Profile columns derived from the plan totals
+    PROFILE_TOTALS_FIELDS = [
+        "total_ai_credits",
+        "total_transactions_limit",
+        "total_accounts_limit",
+        "total_storage_gb",
+        "custom_features",
+        "total_monthly_cost",
+        "updated_at",
+    ]
+
+    def _compute_totals(self, user_addons):
+        """Return (total_monthly_cost, effective_limits) for the given active addons"""
         total_cost = self.base_plan.price
         combined_limits = {
             "ai_credits": self.base_plan.ai_credits_per_month,
@@ -307,7 +397,7 @@ class UserPlanAssignment(TimestampedModel):
         }
 
         # Add addon contributions
-        for user_addon in self.user_addons.filter(is_active=True):
+        for user_addon in user_addons:
             addon = user_addon.addon
             quantity = user_addon.quantity
 
@@ -329,20 +419,49 @@ class UserPlanAssignment(TimestampedModel):
             for feature, value in addon.features.items():
                 combined_limits["features"][feature] = value
 
-        self.total_monthly_cost = total_cost
-        self.effective_limits = combined_limits
-        self.save()
+        return total_cost, combined_limits
 
-        # Update user profile
-        if hasattr(self.user, "profile"):
-            profile = self.user.profile
-            profile.total_ai_credits = combined_limits["ai_credits"]
-            profile.total_transactions_limit = combined_limits["transactions"]
-            profile.total_accounts_limit = combined_limits["accounts"]
-            profile.total_storage_gb = combined_limits["storage_gb"]
-            profile.custom_features = combined_limits["features"]
-            profile.total_monthly_cost = total_cost
-            profile.save()
+    def _apply_totals_to_profile(self, profile):
+        """Copy the calculated totals onto the user's profile (unsaved)"""
+        combined_limits = self.effective_limits
+        profile.total_ai_credits = combined_limits["ai_credits"]
+        profile.total_transactions_limit = combined_limits["transactions"]
+        profile.total_accounts_limit = combined_limits["accounts"]
+        profile.total_storage_gb = combined_limits["storage_gb"]
+        profile.custom_features = combined_limits["features"]
+        profile.total_monthly_cost = self.total_monthly_cost
+
+    def calculate_totals(self):
+        """Recalculate total cost and limits"""
+        # Addons are joined in the same query
+        user_addons = (
+            self.user_addons.filter(is_active=True)
+            .select_related("addon")
+            .only(*self.ADDON_TOTALS_FIELDS)
+        )
+        self.total_monthly_cost, self.effective_limits = self._compute_totals(user_addons)
+        self.__dict__.pop("effective_limits_display", None)
+
+        with transaction.atomic():
+            self.save(update_fields=["total_monthly_cost", "effective_limits", "updated_at"])
+
+            # Update user profile
+            if hasattr(self.user, "profile"):
+                profile = self.user.profile
+                self._apply_totals_to_profile(profile)
+                profile.save(update_fields=self.PROFILE_TOTALS_FIELDS)
+
+    @cached_property
+    def effective_limits_display(self):
+        """Effective limits formatted for display"""
+        limits = self.effective_limits
+        return {
+            "ai_credits": f"{limits.get('ai_credits', 0):,} credits/month",
+            "transactions": f"{limits.get('transactions', 0):,} transactions/month",
+            "accounts": f"{limits.get('accounts', 0)} accounts",
+            "storage": f"{limits.get('storage_gb', 0)} GB storage",
+            "features": [*limits.get("features", {})],
+        }
 
 
 class UserAddon(TimestampedModel):
@@ -357,6 +476,14 @@ class UserAddon(TimestampedModel):
 
     class Meta:
         unique_together = ["user_plan", "addon"]
+        indexes = [
+            # calculate_totals only ever reads a plan's active addons
+            models.Index(
+                fields=["user_plan"],
+                condition=models.Q(is_active=True),
+                name="useraddon_plan_active_idx",
+            ),
+        ]
 
 
 # ================================
@@ -409,7 +536,11 @@ class ActivityLog(TimestampedModel):
 
     class Meta:
         indexes = [
-            models.Index(fields=["user", "activity_type"]),
+            # Serves per-user activity type filters with newest-first ordering
+            models.Index(
+                fields=["user", "activity_type", "-created_at"],
+                name="actlog_user_type_ctd_idx",
+            ),
             models.Index(fields=["user", "created_at"]),
             models.Index(fields=["object_type", "object_id"]),
             models.Index(fields=["status"]),
@@ -447,3 +578,20 @@ class ActivityLog(TimestampedModel):
             ip_address=ip_address,
             user_agent=user_agent,
         )
+
+
+# ================================
+# USER CACHE INVALIDATION
+# ================================
+
+
+def user_cache_key(user_id):
+    """Cache key for the User instance reused by CookieJWTAuthentication"""
+    return f"user:{user_id}"
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    """Drop the cached User so authentication sees the latest row"""
+    cache.delete(user_cache_key(instance.pk))
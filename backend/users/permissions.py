@@ -1,76 +1,73 @@
+from operator import attrgetter
+
 from rest_framework import permissions
 
+_MISSING = object()
+_profile_role = attrgetter("profile.role")
 
-class IsAdmin(permissions.BasePermission):
-    """Allows access only to admin users."""
+
+def _get_role(request):
+    """Return the user's profile role, resolved at most once per request.
+
+    A missing reverse one-to-one is not cached by Django, so without this
+    every permission class and every object check would query for it again.
+    """
+    role = getattr(request, "_cached_role", _MISSING)
+    if role is _MISSING:
+        try:
+            role = _profile_role(request.user)
+        except AttributeError:  # Includes a missing profile
+            role = None
+        request._cached_role = role
+    return role
+
+
+class RolePermission(permissions.BasePermission):
+    """Allows access only to users whose profile role is in `allowed_roles`."""
+
+    allowed_roles = frozenset()
 
     def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and hasattr(request.user, "profile")
-            and request.user.profile.role == "admin"
-        )
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        return _get_role(request) in self.allowed_roles
+
 
+class IsAdmin(RolePermission):
+    """Allows access only to admin users."""
+
+    allowed_roles = frozenset({"admin"})
 
-class IsStaff(permissions.BasePermission):
+
+class IsStaff(RolePermission):
     """Allows access only to staff users."""
 
-    def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and hasattr(request.user, "profile")
-            and request.user.profile.role == "staff"
-        )
+    allowed_roles = frozenset({"staff"})
 
 
-class IsClient(permissions.BasePermission):
+class IsClient(RolePermission):
     """Allows access only to client users."""
 
-    def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and hasattr(request.user, "profile")
-            and request.user.profile.role == "client"
-        )
+    allowed_roles = frozenset({"client"})
 
 
-class IsViewer(permissions.BasePermission):
+class IsViewer(RolePermission):
     """Allows access only to viewer users."""
 
-    def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and hasattr(request.user, "profile")
-            and request.user.profile.role == "viewer"
-        )
+    allowed_roles = frozenset({"viewer"})
 
 
-class IsAdminOrStaff(permissions.BasePermission):
+class IsAdminOrStaff(RolePermission):
     """Allows access only to admin or staff users."""
 
-    def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and hasattr(request.user, "profile")
-            and request.user.profile.role in ["admin", "staff"]
-        )
+    allowed_roles = frozenset({"admin", "staff"})
 
 
-class IsAdminOrStaffOrClient(permissions.BasePermission):
+class IsAdminOrStaffOrClient(RolePermission):
     """Allows access only to admin, staff or client users."""
 
-    def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and hasattr(request.user, "profile")
-            and request.user.profile.role in ["admin", "staff", "client"]
-        )
+    allowed_roles = frozenset({"admin", "staff", "client"})
 
 
 class IsOwnerOrAdmin(permissions.BasePermission):
@@ -82,6 +79,5 @@ class IsOwnerOrAdmin(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the snippet.
-        return obj.user == request.user or (
-            hasattr(request.user, "profile") and request.user.profile.role == "admin"
-        )
+        # Compare the raw FK column so the related user row is never loaded
+        return obj.user_id == request.user.id or _get_role(request) == "admin"
@@ -5,6 +5,7 @@ User-related serializers for the users app.
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from decimal import Decimal
+from functools import cached_property
 from django.utils import timezone
 
 # Import models from users app
@@ -12,6 +13,22 @@ from users.models import UserProfile, Plan, UserPlanAssignment, UserAddon, Activ
 
 User = get_user_model()
 
+# UserSerializer fields that are stored on the user's profile
+PROFILE_FIELDS = frozenset({
+    "phone", "bio", "website", "location", "preferred_currency", "preferred_date_format",
+    "default_currency", "timezone", "language", "theme", "notifications_enabled",
+    "email_notifications", "push_notifications",
+})
+
+# Columns UserSerializer reads, for querysets that .only() past the rest of
+# the profile (API key, limits JSON, subscription data)
+USER_REPRESENTATION_FIELDS = (
+    "id", "username", "email", "first_name", "last_name", "date_joined",
+    *(f"profile__{field}" for field in sorted(PROFILE_FIELDS)),
+    "profile__profile_photo", "profile__profile_photo_thumbnail",
+    "profile__google_profile_picture",
+)
+
 
 # ================================
 # USER AND PROFILE SERIALIZERS
@@ -58,37 +75,21 @@ class UserSerializer(serializers.ModelSerializer):
             validated_data['first_name'] = name_parts[0]
             validated_data['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
 
-        # Extract profile fields
-        profile_fields = {
-            'phone': validated_data.pop('phone', None),
-            'bio': validated_data.pop('bio', None),
-            'website': validated_data.pop('website', None),
-            'location': validated_data.pop('location', None),
-            'preferred_currency': validated_data.pop('preferred_currency', None),
-            'preferred_date_format': validated_data.pop('preferred_date_format', None),
-            'default_currency': validated_data.pop('default_currency', None),
-            'timezone': validated_data.pop('timezone', None),
-            'language': validated_data.pop('language', None),
-            'theme': validated_data.pop('theme', None),
-            'notifications_enabled': validated_data.pop('notifications_enabled', None),
-            'email_notifications': validated_data.pop('email_notifications', None),
-            'push_notifications': validated_data.pop('push_notifications', None),
+        # Split off the profile fields that were actually provided
+        profile_updates = {
+            field: validated_data.pop(field)
+            for field in PROFILE_FIELDS & validated_data.keys()
         }
 
         # Update User model fields
         user = super().update(instance, validated_data)
 
         # Update UserProfile fields if they were provided
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        profile_updated = False
-
-        for field, value in profile_fields.items():
-            if value is not None:
+        if profile_updates:
+            profile, created = UserProfile.objects.get_or_create(user=user)
+            for field, value in profile_updates.items():
                 setattr(profile, field, value)
-                profile_updated = True
-
-        if profile_updated:
-            profile.save()
+            profile.save(update_fields=[*profile_updates, "updated_at"])
 
         return user
 
@@ -98,8 +99,8 @@ class UserSerializer(serializers.ModelSerializer):
         data['full_name'] = f"{instance.first_name} {instance.last_name}".strip()
 
         # Include profile data if available
-        if hasattr(instance, 'profile'):
-            profile = instance.profile
+        profile = getattr(instance, 'profile', None)
+        if profile is not None:
             request = self.context.get('request')
 
             profile_photo_url = None
@@ -193,8 +194,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
         if not obj.subscription_end_date:
             return None
 
-        remaining = obj.subscription_end_date.date() - timezone.now().date()
-        return max(0, remaining.days)
+        # Ordinal arithmetic skips building a timedelta per row
+        remaining = obj.subscription_end_date.date().toordinal() - self._today_ordinal
+        return remaining if remaining > 0 else 0
+
+    @cached_property
+    def _today_ordinal(self):
+        # Read the clock once per serializer; list serializers share one child
+        return timezone.now().date().toordinal()
 
     def to_representation(self, instance):
         """Don't return the encrypted API key"""
@@ -210,6 +217,7 @@ class ProfilePhotoSerializer(serializers.ModelSerializer):
     profile_photo_url = serializers.SerializerMethodField(read_only=True)
     profile_photo_thumbnail_url = serializers.SerializerMethodField(read_only=True)
     has_custom_photo = serializers.SerializerMethodField(read_only=True)
+    profile_photo_status = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = UserProfile
@@ -217,7 +225,8 @@ class ProfilePhotoSerializer(serializers.ModelSerializer):
             'profile_photo',
             'profile_photo_url',
             'profile_photo_thumbnail_url',
-            'has_custom_photo'
+            'has_custom_photo',
+            'profile_photo_status',
         ]
 
     def get_profile_photo_url(self, obj):
@@ -229,6 +238,9 @@ class ProfilePhotoSerializer(serializers.ModelSerializer):
     def get_has_custom_photo(self, obj):
         return bool(obj.profile_photo)
 
+    def get_profile_photo_status(self, obj):
+        return obj.current_profile_photo_status
+
 
 class OnboardingSerializer(serializers.ModelSerializer):
     class Meta:
@@ -245,6 +257,13 @@ class OnboardingSerializer(serializers.ModelSerializer):
             "is_onboarded": {"read_only": False, "required": False},
         }
 
+    def update(self, instance, validated_data):
+        # Only write the submitted onboarding fields, not the whole profile row
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
 
 # ================================
 # PLAN SERIALIZERS
@@ -336,6 +355,10 @@ class UserAddonSerializer(serializers.ModelSerializer):
 
     def get_monthly_cost(self, obj):
         """Calculate monthly cost for this addon instance"""
+        monthly_cost = getattr(obj, "monthly_cost_amount", None)
+        if monthly_cost is not None:
+            return monthly_cost
+
         if obj.addon.billing_cycle == "monthly":
             return obj.addon.price * obj.quantity
         elif obj.addon.billing_cycle == "yearly":
@@ -366,14 +389,7 @@ class UserPlanAssignmentSerializer(serializers.ModelSerializer):
 
     def get_effective_limits_display(self, obj):
         """Format effective limits for display"""
-        limits = obj.effective_limits
-        return {
-            "ai_credits": f"{limits.get('ai_credits', 0):,} credits/month",
-            "transactions": f"{limits.get('transactions', 0):,} transactions/month",
-            "accounts": f"{limits.get('accounts', 0)} accounts",
-            "storage": f"{limits.get('storage_gb', 0)} GB storage",
-            "features": list(limits.get("features", {}).keys()),
-        }
+        return obj.effective_limits_display
 
 
 # ================================
@@ -381,6 +397,28 @@ class UserPlanAssignmentSerializer(serializers.ModelSerializer):
 # ================================
 
 
+def _format_transaction_execution(obj, details):
+    if obj.status == "completed":
+        return f"Successfully executed recurring transaction for {details.get('amount', 'unknown amount')}"
+    return f"Failed to execute recurring transaction: {details.get('error_message', 'Unknown error')}"
+
+
+def _format_ai_usage(obj, details):
+    return f"Used {details.get('provider', 'AI')} for {details.get('usage_type', 'unknown task')}"
+
+
+def _format_plan_change(obj, details):
+    return f"Changed plan: {details.get('change_reason', 'No reason provided')}"
+
+
+# Human-readable details formatters keyed by ActivityLog.activity_type
+ACTIVITY_DETAILS_FORMATTERS = {
+    "transaction_execution": _format_transaction_execution,
+    "ai_usage": _format_ai_usage,
+    "plan_change": _format_plan_change,
+}
+
+
 class ActivityLogSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source="user.username", read_only=True)
     details_display = serializers.SerializerMethodField()
@@ -406,19 +444,7 @@ class ActivityLogSerializer(serializers.ModelSerializer):
 
     def get_details_display(self, obj):
         """Format details for human reading"""
-        activity_type = obj.activity_type
-        details = obj.details
-
-        if activity_type == "transaction_execution":
-            if obj.status == "completed":
-                return f"Successfully executed recurring transaction for {details.get('amount', 'unknown amount')}"
-            else:
-                return f"Failed to execute recurring transaction: {details.get('error_message', 'Unknown error')}"
-
-        elif activity_type == "ai_usage":
-            return f"Used {details.get('provider', 'AI')} for {details.get('usage_type', 'unknown task')}"
-
-        elif activity_type == "plan_change":
-            return f"Changed plan: {details.get('change_reason', 'No reason provided')}"
-
-        return f"{activity_type.replace('_', ' ').title()}"
+        formatter = ACTIVITY_DETAILS_FORMATTERS.get(obj.activity_type)
+        if formatter is not None:
+            return formatter(obj, obj.details)
+        return obj.activity_type.replace("_", " ").title()
@@ -20,10 +20,6 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
             del self.fields["username"]
 
     def validate(self, attrs):
-        print(
-            f"EmailTokenObtainPairSerializer: validate called with attrs: {attrs}"
-        )  # Debug log
-
         email = attrs.get("email")
         password = attrs.get("password")
 
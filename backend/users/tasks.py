@@ -0,0 +1,155 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, pre_delete
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Deletion requests still pending after this long are retried by the sweeper,
+# at most ACCOUNT_DELETION_MAX_RETRIES times
+ACCOUNT_DELETION_RETRY_AFTER = timedelta(hours=1)
+ACCOUNT_DELETION_MAX_RETRIES = 3
+
+
+@shared_task
+def delete_photo_paths(paths):
+    """Delete replaced profile photo files from storage"""
+    for path in paths:
+        try:
+            default_storage.delete(path)
+        except Exception:
+            logger.warning("Could not delete profile photo %s", path, exc_info=True)
+
+
+@shared_task
+def process_profile_photo(profile_id, upload_path):
+    """Resize a stored upload into the profile photo and thumbnail.
+
+    The raw upload is removed once processed, whatever the outcome.
+    """
+    # image_utils imports this module, so resolve it at call time
+    from .image_utils import ProfilePhotoProcessor, cleanup_old_profile_photos
+    from .models import UserProfile
+
+    try:
+        profile = UserProfile.objects.get(id=profile_id)
+    except UserProfile.DoesNotExist:
+        default_storage.delete(upload_path)
+        return
+
+    try:
+        try:
+            with default_storage.open(upload_path) as image_file:
+                main_file, thumbnail_file, errors = ProfilePhotoProcessor.process_profile_photo(
+                    image_file, filename_prefix=f"user_{profile.user_id}"
+                )
+        except Exception:
+            logger.exception("Could not read profile photo upload %s", upload_path)
+            errors = ["Could not read uploaded image"]
+        finally:
+            default_storage.delete(upload_path)
+
+        update_fields = ["profile_photo_status", "updated_at"]
+        if errors:
+            logger.warning("Profile photo processing failed for profile %s: %s", profile_id, errors)
+            profile.profile_photo_status = "failed"
+        else:
+            cleanup_old_profile_photos(profile)
+            profile.profile_photo.save(main_file.name, main_file, save=False)
+            profile.profile_photo_thumbnail.save(thumbnail_file.name, thumbnail_file, save=False)
+            profile.profile_photo_status = "ready"
+            update_fields += ["profile_photo", "profile_photo_thumbnail"]
+
+        profile.save(update_fields=update_fields)
+    except Exception:
+        # Never leave the upload stuck in "processing" for polling clients
+        logger.exception("Could not store processed profile photo for profile %s", profile_id)
+        UserProfile.objects.filter(id=profile_id).update(
+            profile_photo_status="failed", updated_at=timezone.now()
+        )
+
+
+def _raw_delete(queryset):
+    """Delete the queryset's rows in one statement, skipping the Collector.
+
+    Callers must make sure nothing still references the rows. Models with
+    delete signals go through the regular QuerySet.delete() instead.
+    """
+    model = queryset.model
+    if pre_delete.has_listeners(model) or post_delete.has_listeners(model):
+        return queryset.delete()
+    return queryset._raw_delete(queryset.db)
+
+
+@shared_task
+def delete_user_data(user_id):
+    """Delete a user and everything they own.
+
+    Transactions are the bulk of a user's rows, and their tag links stop the
+    Collector from fast-deleting them: it would load every transaction pk and
+    null out categories on rows it is about to delete. Clearing the tag links
+    and then the transactions with plain DELETEs first leaves user.delete()
+    only the small tables to collect.
+    """
+    from finance.models import Transaction
+
+    User = get_user_model()
+
+    # Lending transactions that name the user as contact cascade as well
+    owned_or_lent = Q(user_id=user_id) | Q(contact_user_id=user_id)
+    transaction_ids = Transaction.objects.filter(owned_or_lent).values("pk")
+    transaction_tags = Transaction.tags.through
+    with transaction.atomic():
+        # Lock the user row first so concurrent writes for this user queue up
+        # behind the deletion instead of interleaving with it. A row locked by
+        # another worker means that deletion is already in progress.
+        user = User.objects.select_for_update(skip_locked=True).filter(pk=user_id).first()
+        if user is None:
+            return
+        # Leaf tables first: tag links, then transactions, then the user
+        _raw_delete(transaction_tags.objects.filter(transaction_id__in=transaction_ids))
+        _raw_delete(Transaction.objects.filter(owned_or_lent))
+        user.delete()
+
+    logger.info("User account successfully deleted: %s", user.email)
+
+
+@shared_task
+def sweep_pending_account_deletions():
+    """Re-queue account deletions whose task never finished.
+
+    Claiming a request moves deletion_requested_at to now, so a deletion the
+    sweeper just re-queued is not queued again until another retry window
+    has passed. Requests that used up their retries are logged once and
+    left for an operator.
+    """
+    from .models import UserProfile
+
+    now = timezone.now()
+    cutoff = now - ACCOUNT_DELETION_RETRY_AFTER
+    stale = UserProfile.objects.filter(
+        deletion_requested_at__lt=cutoff,
+        deletion_attempts__lte=ACCOUNT_DELETION_MAX_RETRIES,
+    ).values_list("id", "user_id", "deletion_attempts")
+
+    for profile_id, user_id, attempts in stale:
+        claimed = UserProfile.objects.filter(
+            id=profile_id, deletion_requested_at__lt=cutoff
+        ).update(deletion_requested_at=now, deletion_attempts=F("deletion_attempts") + 1)
+        if not claimed:
+            continue
+
+        if attempts >= ACCOUNT_DELETION_MAX_RETRIES:
+            # The bump above takes the request past the filter for good
+            logger.error(
+                "Giving up on deleting user %s after %s retries", user_id, attempts
+            )
+            continue
+
+        delete_user_data.delay(user_id)
@@ -1,5 +1,23 @@
+import io
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from PIL import Image
 from rest_framework.test import APITestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
 from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from users.models import Plan, UserAddon, UserPlanAssignment, UserProfile
+from users.tasks import process_profile_photo
+
+User = get_user_model()
 
 
 class UserAPITests(APITestCase):
@@ -9,3 +27,141 @@ class UserAPITests(APITestCase):
         """
         response = self.client.get(reverse("user-list"))
         self.assertEqual(response.status_code, 401)
+
+
+class UserMeETagTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="me@example.com", email="me@example.com", password="password123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.me_url = reverse("users-me")
+
+    def test_matching_etag_returns_not_modified(self):
+        """
+        Ensure /me answers 304 when the client already has the current data.
+        """
+        response = self.client.get(self.me_url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        cached = self.client.get(self.me_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], etag)
+        self.assertIn("no-cache", cached["Cache-Control"])
+
+    def test_changed_user_gets_new_etag(self):
+        """
+        Ensure an edit invalidates the ETag the client is holding.
+        """
+        etag = self.client.get(self.me_url)["ETag"]
+
+        self.user.first_name = "Changed"
+        self.user.save()
+
+        response = self.client.get(self.me_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["first_name"], "Changed")
+
+
+class AddAddonTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="addon@example.com", email="addon@example.com", password="password123"
+        )
+        self.client.force_authenticate(user=self.user)
+        base_plan = Plan.objects.create(name="Base", plan_type="base", price=Decimal("5.00"))
+        self.addon = Plan.objects.create(
+            name="Extra credits", plan_type="addon", price=Decimal("2.00")
+        )
+        self.assignment = UserPlanAssignment.objects.create(user=self.user, base_plan=base_plan)
+        self.url = reverse("plan-assignment-add-addon", args=[self.assignment.pk])
+
+    def test_adding_an_addon_twice_increments_one_row(self):
+        """
+        Ensure add_addon creates the row once and then adds to its quantity.
+        """
+        first = self.client.post(self.url, {"addon_id": self.addon.id}, format="json")
+        self.assertEqual(first.status_code, 200)
+        second = self.client.post(
+            self.url, {"addon_id": self.addon.id, "quantity": 2}, format="json"
+        )
+        self.assertEqual(second.status_code, 200)
+
+        user_addons = UserAddon.objects.filter(user_plan=self.assignment, addon=self.addon)
+        self.assertEqual(user_addons.count(), 1)
+        self.assertEqual(user_addons.get().quantity, 3)
+
+    def test_unknown_addon_is_not_found(self):
+        """
+        Ensure an inactive or missing addon is rejected without creating a row.
+        """
+        response = self.client.post(self.url, {"addon_id": 0}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(UserAddon.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProfilePhotoPipelineTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="photo@example.com", email="photo@example.com", password="password123"
+        )
+        self.client.force_authenticate(user=self.user)
+        # By id, so the user instance shared across requests caches no profile
+        self.profile = UserProfile.objects.create(user_id=self.user.id)
+
+    def _jpeg_upload(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (32, 32), (200, 30, 30)).save(buffer, format="JPEG")
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_is_processed_on_a_worker(self):
+        """
+        Ensure the upload answers 202 and the queued task produces the photo.
+        """
+        with patch("users.views.process_profile_photo") as process_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("users-upload-profile-photo"),
+                    {"profile_photo": self._jpeg_upload()},
+                    format="multipart",
+                )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["profile_photo_status"], "processing")
+        process_task.delay.assert_called_once()
+        profile_id, upload_path = process_task.delay.call_args.args
+
+        process_profile_photo(profile_id, upload_path)
+
+        info = self.client.get(reverse("users-profile-photo-info"))
+        self.assertEqual(info.data["profile_photo_status"], "ready")
+        self.assertTrue(info.data["has_custom_photo"])
+        self.assertFalse(default_storage.exists(upload_path))
+
+    def test_unreadable_upload_marks_photo_failed(self):
+        """
+        Ensure a bad upload ends in "failed" rather than staying "processing".
+        """
+        upload_path = default_storage.save("profile_photos/uploads/broken", ContentFile(b"nope"))
+        UserProfile.objects.filter(pk=self.profile.pk).update(profile_photo_status="processing")
+
+        process_profile_photo(self.profile.pk, upload_path)
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.profile_photo_status, "failed")
+        self.assertFalse(default_storage.exists(upload_path))
+
+    def test_stale_processing_status_is_reported_as_failed(self):
+        """
+        Ensure clients stop polling when the processing task was lost.
+        """
+        stale_at = timezone.now() - UserProfile.PROFILE_PHOTO_PROCESSING_TIMEOUT - timedelta(minutes=1)
+        UserProfile.objects.filter(pk=self.profile.pk).update(
+            profile_photo_status="processing", updated_at=stale_at
+        )
+
+        info = self.client.get(reverse("users-profile-photo-info"))
+        self.assertEqual(info.data["profile_photo_status"], "failed")
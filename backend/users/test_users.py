@@ -1,6 +1,25 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
 from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from core.error_handlers import APIErrorCodes
+from finance.models import Tag, Transaction
+from users.auth_backends import get_cached_user
+from users.models import UserProfile, user_cache_key
+from users.tasks import (
+    ACCOUNT_DELETION_MAX_RETRIES,
+    ACCOUNT_DELETION_RETRY_AFTER,
+    delete_user_data,
+    sweep_pending_account_deletions,
+)
 
 User = get_user_model()
 
@@ -77,3 +96,131 @@ class UserAuthenticationTests(APITestCase):
         self.assertIn(
             response_after_logout.status_code, [401, 403]
         )  # Unauthorized or Forbidden
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class UserCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="cached@example.com",
+            email="cached@example.com",
+            password="password123",
+        )
+
+    def test_saving_user_evicts_cached_copy(self):
+        """
+        Ensure authentication never reuses a stale cached user after a save.
+        """
+        get_cached_user(self.user.id)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.id)))
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+        self.assertFalse(get_cached_user(self.user.id).is_active)
+
+    def test_deleting_user_evicts_cached_copy(self):
+        """
+        Ensure a deleted user cannot be resolved from the cache.
+        """
+        user_id = self.user.id
+        get_cached_user(user_id)
+
+        self.user.delete()
+
+        self.assertIsNone(cache.get(user_cache_key(user_id)))
+        with self.assertRaises(User.DoesNotExist):
+            get_cached_user(user_id)
+
+
+class AccountDeletionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="leaving@example.com",
+            email="leaving@example.com",
+            password="password123",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_delete_request_deactivates_and_queues_deletion(self):
+        """
+        Ensure the request answers 202, locks the account and queues the task.
+        """
+        with patch("users.views.delete_user_data") as delete_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(reverse("user_account_delete"))
+
+        self.assertEqual(response.status_code, 202)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(UserProfile.objects.get(user=self.user).deletion_requested_at)
+        delete_task.delay.assert_called_once_with(self.user.id)
+
+    def test_database_error_returns_standard_error_and_rolls_back(self):
+        """
+        Ensure a database failure answers with the API's JSON error shape.
+        """
+        with patch(
+            "users.views.UserProfile.objects.update_or_create",
+            side_effect=DatabaseError("connection lost"),
+        ):
+            response = self.client.delete(reverse("user_account_delete"))
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data["error"]["code"], APIErrorCodes.DATABASE_ERROR)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    def test_delete_task_removes_transactions_tag_links_and_user(self):
+        """
+        Ensure the worker deletes the user's transactions, their tags and the user.
+        """
+        tag = Tag.objects.create(user=self.user, name="rent")
+        owned = Transaction.objects.create(
+            user=self.user, amount=Decimal("10.00"), description="Rent", date=date.today()
+        )
+        owned.tags.add(tag)
+        other = User.objects.create_user(username="other@example.com", password="password123")
+        Transaction.objects.create(
+            user=other,
+            contact_user=self.user,
+            amount=Decimal("5.00"),
+            description="Loan",
+            date=date.today(),
+        )
+
+        delete_user_data(self.user.id)
+
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Transaction.objects.filter(user_id=self.user.pk).exists())
+        self.assertFalse(Transaction.objects.filter(contact_user_id=self.user.pk).exists())
+        self.assertFalse(Transaction.tags.through.objects.filter(tag_id=tag.pk).exists())
+        self.assertTrue(User.objects.filter(pk=other.pk).exists())
+
+    def test_sweeper_requeues_stale_requests_until_retries_run_out(self):
+        """
+        Ensure stale requests are retried a bounded number of times.
+        """
+        stale_at = timezone.now() - ACCOUNT_DELETION_RETRY_AFTER - timedelta(minutes=1)
+        profile, _ = UserProfile.objects.update_or_create(
+            user=self.user, defaults={"deletion_requested_at": stale_at}
+        )
+
+        with patch("users.tasks.delete_user_data") as delete_task:
+            sweep_pending_account_deletions()
+            # Just claimed, so the next sweep leaves it alone
+            sweep_pending_account_deletions()
+        delete_task.delay.assert_called_once_with(self.user.id)
+        profile.refresh_from_db()
+        self.assertEqual(profile.deletion_attempts, 1)
+
+        UserProfile.objects.filter(pk=profile.pk).update(
+            deletion_requested_at=stale_at, deletion_attempts=ACCOUNT_DELETION_MAX_RETRIES
+        )
+        with patch("users.tasks.delete_user_data") as delete_task:
+            with self.assertLogs("users.tasks", level="ERROR"):
+                sweep_pending_account_deletions()
+        delete_task.delay.assert_not_called()
@@ -1,7 +1,11 @@
 # Standard library imports
+import hashlib
 import logging
+import uuid
 
 # Third-party imports
+import requests
+from requests.adapters import HTTPAdapter
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -9,16 +13,16 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.token_blacklist.models import (
-    OutstandingToken,
-    BlacklistedToken,
-)
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
 from django.contrib.auth import get_user_model, login
-from django.db.models import F, Q
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Prefetch, Q, When
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils import timezone
 from django.utils.http import urlencode
 from django.shortcuts import redirect
 
@@ -28,8 +32,10 @@ from allauth.socialaccount.models import SocialAccount
 # Local application imports
 import finance.models as fmodels
 from users.serializers_auth import EmailTokenObtainPairSerializer
+from users.auth_backends import get_cached_user
 from users.models import Plan, UserPlanAssignment, UserAddon, ActivityLog, UserProfile
-from users.image_utils import ProfilePhotoProcessor, cleanup_old_profile_photos
+from users.image_utils import ProfilePhotoProcessor
+from users.tasks import delete_user_data, process_profile_photo
 from finance.models import GroupExpenseShare
 from users.serializers import (
     UserSerializer,
@@ -37,6 +43,7 @@ from users.serializers import (
     ActivityLogSerializer,
     OnboardingSerializer,
     ProfilePhotoSerializer,
+    USER_REPRESENTATION_FIELDS,
 )
 from finance.serializers import (
     AccountSerializer,
@@ -53,7 +60,7 @@ def _handle_api_exception(
     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
     message="An unexpected error occurred.",
 ):
-    logger.exception(f"API Exception: {e}")  # Use exception to log traceback
+    logger.exception("API Exception: %s", e)  # Use exception to log traceback
     return Response(
         {"error": message if message != "An unexpected error occurred." else str(e)},
         status=status_code,
@@ -62,6 +69,69 @@ def _handle_api_exception(
 
 User = get_user_model()
 
+# Keep-alive connections to Google's OAuth endpoints, shared across logins
+GOOGLE_HTTP_SESSION = requests.Session()
+GOOGLE_HTTP_SESSION.mount("https://", HTTPAdapter(pool_maxsize=32))
+GOOGLE_HTTP_TIMEOUT = 10
+
+
+# Lifetimes of the httpOnly JWT cookies, matching SIMPLE_JWT's token lifetimes
+ACCESS_COOKIE_MAX_AGE = 60 * 60  # 1 hour
+REFRESH_COOKIE_MAX_AGE = 60 * 60 * 24 * 7  # 7 days
+
+
+def set_auth_cookies(response, access_token, refresh_token):
+    """Set the httpOnly access and refresh cookies, skipping empty tokens"""
+    secure = settings.JWT_COOKIE_SECURE
+    samesite = settings.JWT_COOKIE_SAMESITE
+    for name, value, max_age in (
+        ("access_token", access_token, ACCESS_COOKIE_MAX_AGE),
+        ("refresh_token", refresh_token, REFRESH_COOKIE_MAX_AGE),
+    ):
+        if value:
+            response.set_cookie(
+                name, value, max_age=max_age, httponly=True, secure=secure, samesite=samesite
+            )
+
+
+def clear_auth_cookies(response):
+    """Expire both JWT cookies"""
+    secure = settings.JWT_COOKIE_SECURE
+    samesite = settings.JWT_COOKIE_SAMESITE
+    for name in ("access_token", "refresh_token"):
+        response.set_cookie(
+            name,
+            "",
+            expires="Thu, 01 Jan 1970 00:00:00 GMT",
+            max_age=0,
+            httponly=True,
+            secure=secure,
+            samesite=samesite,
+            path="/",
+        )
+
+
+def _user_etag(user):
+    """ETag for UserSerializer output, built from the columns it renders.
+
+    Profile edits always bump profile.updated_at, so the timestamp stands in
+    for every profile field.
+    """
+    profile = getattr(user, "profile", None)
+    profile_version = profile.updated_at.isoformat() if profile is not None else ""
+    fingerprint = "|".join(
+        str(value)
+        for value in (
+            user.pk,
+            user.username,
+            user.email,
+            user.first_name,
+            user.last_name,
+            profile_version,
+        )
+    )
+    return '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     """Custom JWT token view that accepts email and returns user info with secure httpOnly cookies"""
@@ -69,49 +139,28 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = EmailTokenObtainPairSerializer
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        logger.debug(
-            f"CustomTokenObtainPairView: Response status: {response.status_code}"
-        )
-        logger.debug(f"CustomTokenObtainPairView: Response data: {response.data}")
-
-        # Add user info to response
+        # Validate once and reuse serializer.user; re-validating to get the
+        # user would hash the password a second time
         serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.user
-            response.data["user"] = UserSerializer(user).data
-
-            # Keep tokens in response body for frontend localStorage usage
-            # Also set secure httpOnly cookies for additional security (optional)
-            access_token = response.data.get("access")
-            refresh_token = response.data.get("refresh")
-
-            if access_token:
-                # Set httpOnly cookie for security
-                response.set_cookie(
-                    "access_token",
-                    access_token,
-                    max_age=60 * 60,  # 1 hour
-                    httponly=True,
-                    secure=settings.JWT_COOKIE_SECURE,
-                    samesite=settings.JWT_COOKIE_SAMESITE,
-                )
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
 
-            if refresh_token:
-                response.set_cookie(
-                    "refresh_token",
-                    refresh_token,
-                    max_age=60 * 60 * 24 * 7,  # 7 days
-                    httponly=True,
-                    secure=settings.JWT_COOKIE_SECURE,
-                    samesite=settings.JWT_COOKIE_SAMESITE,
-                )
+        response = Response(serializer.validated_data, status=status.HTTP_200_OK)
+        response.data["user"] = UserSerializer(serializer.user).data
 
-            # In production, you may want to remove tokens from response body and rely on httpOnly cookies only
-            # For local development (DEBUG=True), keep tokens in body to simplify frontend usage
-            if not settings.DEBUG:
-                response.data.pop("access", None)
-                response.data.pop("refresh", None)
+        # Keep tokens in response body for frontend localStorage usage
+        # Also set secure httpOnly cookies for additional security (optional)
+        set_auth_cookies(
+            response, response.data.get("access"), response.data.get("refresh")
+        )
+
+        # In production, you may want to remove tokens from response body and rely on httpOnly cookies only
+        # For local development (DEBUG=True), keep tokens in body to simplify frontend usage
+        if not settings.DEBUG:
+            response.data.pop("access", None)
+            response.data.pop("refresh", None)
 
         return response
 
@@ -131,22 +180,18 @@ class CustomTokenRefreshView(APIView):
             return Response({"error": "Refresh token not found"}, status=400)
 
         try:
-            # Validate and refresh the token
+            # Validate and refresh the token; with the blacklist app installed
+            # this also rejects blacklisted tokens
             refresh = RefreshToken(refresh_token)
 
-            # Check if the refresh token is blacklisted
-            from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
-
-            jti = refresh.get("jti")
-            if BlacklistedToken.objects.filter(token__jti=jti).exists():
-                raise TokenError("Token is blacklisted")
-
             access_token = str(refresh.access_token)
-            new_refresh_token = str(refresh)
+            # Refresh tokens are not rotated, so hand back the validated token
+            # as-is instead of signing an identical one
+            new_refresh_token = refresh_token
 
             # Get user info for response
             user_id = refresh.get("user_id")
-            user = User.objects.get(id=user_id)
+            user = get_cached_user(user_id)
 
             # Create response with tokens (in DEBUG mode) and user info
             response_data = {
@@ -166,23 +211,7 @@ class CustomTokenRefreshView(APIView):
             response = Response(response_data)
 
             # Set new tokens as httpOnly cookies
-            response.set_cookie(
-                "access_token",
-                access_token,
-                max_age=60 * 60,  # 1 hour
-                httponly=True,
-                secure=settings.JWT_COOKIE_SECURE,
-                samesite=settings.JWT_COOKIE_SAMESITE,
-            )
-
-            response.set_cookie(
-                "refresh_token",
-                new_refresh_token,
-                max_age=60 * 60 * 24 * 7,  # 7 days
-                httponly=True,
-                secure=settings.JWT_COOKIE_SECURE,
-                samesite=settings.JWT_COOKIE_SAMESITE,
-            )
+            set_auth_cookies(response, access_token, new_refresh_token)
 
             return response
 
@@ -210,13 +239,28 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return User.objects.filter(id=self.request.user.id)
+        # UserSerializer renders profile fields, so join the profile up front
+        # and load only the columns it reads
+        return (
+            User.objects.filter(id=self.request.user.id)
+            .select_related("profile")
+            .only(*USER_REPRESENTATION_FIELDS)
+        )
 
     @action(detail=False, methods=["get"])
     def me(self, request):
         """Get current user profile"""
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        etag = _user_etag(request.user)
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            serializer = self.get_serializer(request.user)
+            response = Response(serializer.data)
+        response["ETag"] = etag
+        # Per-user data: let the browser keep it but revalidate every time
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     @action(detail=False, methods=["patch"])
     def update_preferences(self, request):
@@ -238,19 +282,13 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Search users by email or username (excluding current user)
-        users = User.objects.filter(
-            Q(email__icontains=query) | Q(username__icontains=query)
-        ).exclude(id=request.user.id)[:10]  # Limit to 10 results
-
-        # Return minimal user info for privacy
-        results = []
-        for user in users:
-            results.append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-            })
+        # Search users by email or username (excluding current user), returning
+        # minimal user info for privacy
+        results = list(
+            User.objects.filter(Q(email__icontains=query) | Q(username__icontains=query))
+            .exclude(id=request.user.id)
+            .values('id', 'username', 'email')[:10]  # Limit to 10 results
+        )
 
         return Response(results)
 
@@ -276,29 +314,21 @@ class UserViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Clean up old photos
-            cleanup_old_profile_photos(profile)
-
-            # Process image
-            main_file, thumbnail_file, processing_errors = ProfilePhotoProcessor.process_profile_photo(
+            # Park the raw upload in storage and resize it on a worker so the
+            # request thread is not tied up decoding and encoding the image
+            upload_path = default_storage.save(
+                f"profile_photos/uploads/user_{request.user.id}_{uuid.uuid4().hex}",
                 image_file,
-                filename_prefix=f"user_{request.user.id}"
+            )
+            profile.profile_photo_status = "processing"
+            profile.save(update_fields=["profile_photo_status", "updated_at"])
+            transaction.on_commit(
+                lambda: process_profile_photo.delay(profile.id, upload_path)
             )
 
-            if processing_errors:
-                return Response(
-                    {"errors": processing_errors},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Save processed images to profile
-            profile.profile_photo.save(main_file.name, main_file, save=False)
-            profile.profile_photo_thumbnail.save(thumbnail_file.name, thumbnail_file, save=False)
-            profile.save()
-
-            # Return updated profile photo info
+            # Clients poll profile_photo_info until the status leaves "processing"
             serializer = ProfilePhotoSerializer(profile)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.exception("Error uploading profile photo")
@@ -357,7 +387,7 @@ class AccountViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return fmodels.Account.objects.filter(user=self.request.user)
+        return fmodels.Account.objects.filter(user_id=self.request.user.id)
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -365,7 +395,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return fmodels.Category.objects.filter(user=self.request.user)
+        return fmodels.Category.objects.filter(user_id=self.request.user.id)
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -373,7 +403,18 @@ class TagViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return fmodels.Tag.objects.filter(user=self.request.user)
+        return fmodels.Tag.objects.filter(user_id=self.request.user.id)
+
+
+# Monthly cost of a user addon, computed by the database for list responses
+ADDON_MONTHLY_COST = Case(
+    When(
+        addon__billing_cycle="yearly",
+        then=F("addon__price") * F("quantity") / 12,
+    ),
+    default=F("addon__price") * F("quantity"),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
 
 
 class UserPlanAssignmentViewSet(viewsets.ModelViewSet):
@@ -381,7 +422,28 @@ class UserPlanAssignmentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return UserPlanAssignment.objects.filter(user=self.request.user)
+        # PlanSerializer reads base_plan, included_addons and compatible_with
+        # for the base plan and every addon; load them all up front
+        return (
+            UserPlanAssignment.objects.filter(user_id=self.request.user.id)
+            .select_related("base_plan__base_plan")
+            .prefetch_related(
+                "base_plan__included_addons",
+                "base_plan__compatible_with",
+                Prefetch(
+                    "user_addons",
+                    queryset=UserAddon.objects.select_related("addon__base_plan")
+                    .prefetch_related("addon__included_addons", "addon__compatible_with")
+                    .annotate(monthly_cost_amount=ADDON_MONTHLY_COST),
+                ),
+            )
+        )
+
+    def _assignment_response(self, assignment):
+        # Reload through get_queryset so the addon prefetches are fresh after
+        # a change and the serializer doesn't fall back to per-addon queries
+        assignment = self.get_queryset().get(pk=assignment.pk)
+        return Response(self.get_serializer(assignment).data)
 
     @action(detail=False, methods=["post"])
     def assign_plan(self, request):
@@ -407,8 +469,7 @@ class UserPlanAssignmentViewSet(viewsets.ModelViewSet):
             assignment.save()
 
         assignment.calculate_totals()
-        serializer = self.get_serializer(assignment)
-        return Response(serializer.data)
+        return self._assignment_response(assignment)
 
     @action(detail=True, methods=["post"])
     def add_addon(self, request, pk=None):
@@ -424,17 +485,28 @@ class UserPlanAssignmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        user_addon, created = UserAddon.objects.get_or_create(
-            user_plan=assignment, addon=addon, defaults={"quantity": quantity}
+        # Bump an existing row in one UPDATE; update() skips auto_now, so
+        # updated_at is set explicitly
+        existing = UserAddon.objects.filter(user_plan=assignment, addon=addon)
+        updated = existing.update(
+            quantity=F("quantity") + quantity, updated_at=timezone.now()
         )
-        if not created:
-            user_addon.quantity = F("quantity") + quantity
-            user_addon.save()
-            user_addon.refresh_from_db()
+        if not updated:
+            try:
+                # The savepoint keeps a lost race from breaking the request's
+                # transaction, so the retried UPDATE below can still run
+                with transaction.atomic():
+                    UserAddon.objects.create(
+                        user_plan=assignment, addon=addon, quantity=quantity
+                    )
+            except IntegrityError:
+                # A concurrent request created the row first; add to it instead
+                existing.update(
+                    quantity=F("quantity") + quantity, updated_at=timezone.now()
+                )
 
         assignment.calculate_totals()
-        serializer = self.get_serializer(assignment)
-        return Response(serializer.data)
+        return self._assignment_response(assignment)
 
     @action(detail=True, methods=["post"])
     def remove_addon(self, request, pk=None):
@@ -451,8 +523,7 @@ class UserPlanAssignmentViewSet(viewsets.ModelViewSet):
             )
 
         assignment.calculate_totals()
-        serializer = self.get_serializer(assignment)
-        return Response(serializer.data)
+        return self._assignment_response(assignment)
 
 
 class GroupExpenseShareViewSet(viewsets.ModelViewSet):
@@ -460,7 +531,7 @@ class GroupExpenseShareViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return GroupExpenseShare.objects.filter(group_expense__user=self.request.user)
+        return GroupExpenseShare.objects.filter(group_expense__user_id=self.request.user.id)
 
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -468,8 +539,11 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return ActivityLog.objects.filter(user=self.request.user).order_by(
-            "-created_at"
+        # user_name is rendered per row, so join the user instead of fetching it each time
+        return (
+            ActivityLog.objects.filter(user_id=self.request.user.id)
+            .select_related("user")
+            .order_by("-created_at")
         )
 
 
@@ -478,7 +552,7 @@ class OnboardingViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return UserProfile.objects.filter(user=self.request.user)
+        return UserProfile.objects.filter(user_id=self.request.user.id)
 
     def get_object(self):
         return self.request.user.profile
@@ -543,7 +617,10 @@ class GoogleLogin(APIView):
         state = request.GET.get("state", "")
         error = request.GET.get("error")
 
-        logger.info(f"GET request to Google callback - code: {code[:10] if code else None}..., state: {state}, error: {error}")
+        logger.info(
+            "GET request to Google callback - code: %s..., state: %s, error: %s",
+            code[:10] if code else None, state, error,
+        )
 
         if error:
             frontend_url = f"http://localhost:5173/google-callback?error={error}"
@@ -561,14 +638,15 @@ class GoogleLogin(APIView):
         return self._handle_google_auth(request)
 
     def _handle_google_auth(self, request):
-        import requests
-
         try:
             # Get code from either GET parameters (redirect) or POST data (API call)
             code = request.GET.get("code") or request.data.get("code")
             state = request.GET.get("state") or request.data.get("state")
 
-            logger.info(f"Google OAuth callback - code: {code[:10] if code else None}..., state: {state}")
+            logger.info(
+                "Google OAuth callback - code: %s..., state: %s",
+                code[:10] if code else None, state,
+            )
 
             if not code:
                 logger.error("Authorization code is missing")
@@ -599,17 +677,23 @@ class GoogleLogin(APIView):
                 "redirect_uri": redirect_uri,
             }
 
-            token_response = requests.post(token_url, data=token_data)
+            token_response = GOOGLE_HTTP_SESSION.post(
+                token_url, data=token_data, timeout=GOOGLE_HTTP_TIMEOUT
+            )
             token_json = token_response.json()
 
-            logger.info(f"Google token response status: {token_response.status_code}")
-            logger.info(f"Google token response: {token_json}")
+            logger.info("Google token response status: %s", token_response.status_code)
+            # The response body carries the tokens, so only its keys are logged
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Google token response keys: %s", sorted(token_json))
 
             if "access_token" not in token_json:
                 error_msg = token_json.get('error_description', token_json.get('error', 'Unknown error'))
                 error_type = token_json.get('error', '')
 
-                logger.error(f"Failed to get access token from Google: {error_msg} (type: {error_type})")
+                logger.error(
+                    "Failed to get access token from Google: %s (type: %s)", error_msg, error_type
+                )
 
                 # If authorization code was already used, this is likely a duplicate request
                 if 'invalid_grant' in error_type or 'authorization code' in error_msg.lower():
@@ -625,9 +709,14 @@ class GoogleLogin(APIView):
 
             # Use access token to get user info
             access_token = token_json["access_token"]
-            user_info_url = f"https://www.googleapis.com/oauth2/v2/userinfo?access_token={access_token}"
+            user_info_url = "https://www.googleapis.com/oauth2/v2/userinfo"
 
-            user_response = requests.get(user_info_url)
+            # Send the token in a header so it never appears in URL logs
+            user_response = GOOGLE_HTTP_SESSION.get(
+                user_info_url,
+                headers={"Authorization": f"Bearer {access_token}"},
+                timeout=GOOGLE_HTTP_TIMEOUT,
+            )
             user_data = user_response.json()
 
             # Find or create user
@@ -639,36 +728,40 @@ class GoogleLogin(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            logger.info(f"Processing Google login for email: {email}")
-
-            # Check if user exists
-            try:
-                user = User.objects.get(email=email)
-                created = False
-                logger.info(f"Found existing user: {user.email}")
-            except User.DoesNotExist:
-                # Create new user
-                user = User.objects.create_user(
-                    username=email,
-                    email=email,
-                    first_name=user_data.get("given_name", ""),
-                    last_name=user_data.get("family_name", ""),
+            logger.info("Processing Google login for email: %s", email)
+
+            # Commit the user, social account and profile writes together
+            with transaction.atomic():
+                # Check if user exists
+                user = User.objects.filter(email=email).first()
+                created = user is None
+                if created:
+                    # Create new user
+                    user = User.objects.create_user(
+                        username=email,
+                        email=email,
+                        first_name=user_data.get("given_name", ""),
+                        last_name=user_data.get("family_name", ""),
+                    )
+                    logger.info("Created new user: %s", user.email)
+                else:
+                    logger.info("Found existing user: %s", user.email)
+
+                # Create or get social account
+                social_account, _ = SocialAccount.objects.get_or_create(
+                    user=user,
+                    provider="google",
+                    defaults={"uid": user_data.get("id"), "extra_data": user_data},
                 )
-                created = True
-                logger.info(f"Created new user: {user.email}")
 
-            # Create or get social account
-            social_account, _ = SocialAccount.objects.get_or_create(
-                user=user,
-                provider="google",
-                defaults={"uid": user_data.get("id"), "extra_data": user_data},
-            )
-
-            # Update user profile with Google data
-            profile, _ = UserProfile.objects.get_or_create(user=user)
-            profile.google_profile_picture = user_data.get("picture")
-            profile.google_email_verified = user_data.get("verified_email", False)
-            profile.save()
+                # Update user profile with Google data
+                UserProfile.objects.update_or_create(
+                    user=user,
+                    defaults={
+                        "google_profile_picture": user_data.get("picture"),
+                        "google_email_verified": user_data.get("verified_email", False),
+                    },
+                )
 
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
@@ -691,23 +784,7 @@ class GoogleLogin(APIView):
             response = Response(response_data, status=status.HTTP_200_OK)
 
             # Set httpOnly cookies
-            response.set_cookie(
-                "access_token",
-                jwt_access_token,
-                max_age=60 * 60,  # 1 hour
-                httponly=True,
-                secure=settings.JWT_COOKIE_SECURE,
-                samesite=settings.JWT_COOKIE_SAMESITE,
-            )
-
-            response.set_cookie(
-                "refresh_token",
-                refresh_token,
-                max_age=60 * 60 * 24 * 7,  # 7 days
-                httponly=True,
-                secure=settings.JWT_COOKIE_SECURE,
-                samesite=settings.JWT_COOKIE_SAMESITE,
-            )
+            set_auth_cookies(response, jwt_access_token, refresh_token)
 
             return response
 
@@ -732,19 +809,24 @@ class RegisterView(APIView):
         if not email or not password:
             return Response({"error": "Email and password required"}, status=400)
 
-        if User.objects.filter(Q(email=email) | Q(username=email)).exists():
+        first_name, _, last_name = full_name.partition(" ")
+
+        # The unique username and email indexes reject duplicates, so no
+        # separate existence check is needed
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=email,  # Use email as username
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name,
+                )
+        except IntegrityError:
             return Response(
                 {"error": "User with this email already exists"}, status=400
             )
 
-        user = User.objects.create_user(
-            username=email,  # Use email as username
-            email=email,
-            password=password,
-            first_name=full_name.split(" ")[0] if full_name else "",
-            last_name=" ".join(full_name.split(" ")[1:]) if " " in full_name else "",
-        )
-
         refresh = RefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
@@ -764,23 +846,7 @@ class RegisterView(APIView):
         response = Response(response_payload, status=status.HTTP_201_CREATED)
 
         # Set httpOnly cookies for security
-        response.set_cookie(
-            "access_token",
-            access_token,
-            max_age=60 * 60,  # 1 hour
-            httponly=True,
-            secure=settings.JWT_COOKIE_SECURE,
-            samesite=settings.JWT_COOKIE_SAMESITE,
-        )
-
-        response.set_cookie(
-            "refresh_token",
-            refresh_token,
-            max_age=60 * 60 * 24 * 7,  # 7 days
-            httponly=True,
-            secure=settings.JWT_COOKIE_SECURE,
-            samesite=settings.JWT_COOKIE_SAMESITE,
-        )
+        set_auth_cookies(response, access_token, refresh_token)
 
         return response
 
@@ -798,37 +864,18 @@ class LogoutView(APIView):
 
         if refresh_token:
             try:
-                token = RefreshToken(refresh_token)
-                outstanding_token = OutstandingToken.objects.get(jti=token["jti"])
-                BlacklistedToken.objects.get_or_create(token=outstanding_token)
+                # blacklist() also records tokens that were never tracked as
+                # outstanding, and is a no-op for ones already blacklisted
+                RefreshToken(refresh_token).blacklist()
             except TokenError as e:
-                logger.error(f"Error blacklisting token: {e}")
+                logger.error("Error blacklisting token: %s", e)
 
         response = Response(
             {"message": "Successfully logged out"}, status=status.HTTP_200_OK
         )
 
         # Clear httpOnly cookies
-        response.set_cookie(
-            "access_token",
-            "",
-            expires="Thu, 01 Jan 1970 00:00:00 GMT",
-            max_age=0,
-            httponly=True,
-            secure=settings.JWT_COOKIE_SECURE,
-            samesite=settings.JWT_COOKIE_SAMESITE,
-            path="/",
-        )
-        response.set_cookie(
-            "refresh_token",
-            "",
-            expires="Thu, 01 Jan 1970 00:00:00 GMT",
-            max_age=0,
-            httponly=True,
-            secure=settings.JWT_COOKIE_SECURE,
-            samesite=settings.JWT_COOKIE_SAMESITE,
-            path="/",
-        )
+        clear_auth_cookies(response)
 
         return response
 
@@ -841,24 +888,22 @@ class UserAccountDeleteView(APIView):
         """Permanently delete user account and all associated data"""
         user = request.user
 
-        try:
-            # Log the account deletion attempt
-            logger.info(f"User account deletion requested for user: {user.email}")
-
-            # Delete user and all associated data (CASCADE should handle related objects)
-            user.delete()
-
-            # Log successful deletion
-            logger.info(f"User account successfully deleted: {user.email}")
+        # Log the account deletion attempt
+        logger.info("User account deletion requested for user: %s", user.email)
 
-            return Response(
-                {"message": "User account and all associated data have been permanently deleted"},
-                status=status.HTTP_200_OK
+        # Lock the account out now and remove its data on a worker; saving
+        # the user also evicts it from the authentication cache. Database
+        # errors are answered by the API exception handler.
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=["is_active"])
+            UserProfile.objects.update_or_create(
+                user=user,
+                defaults={"deletion_requested_at": timezone.now(), "deletion_attempts": 0},
             )
+            transaction.on_commit(lambda: delete_user_data.delay(user.id))
 
-        except Exception as e:
-            logger.error(f"Error deleting user account {user.email}: {str(e)}")
-            return Response(
-                {"detail": "Failed to delete user account"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(
+            {"message": "User account and all associated data are being permanently deleted"},
+            status=status.HTTP_202_ACCEPTED
+        )
@@ -4,6 +4,10 @@ import { Camera, Upload, X, Trash2, Check } from 'lucide-react';
 import { toast } from 'react-hot-toast';
 import 'react-image-crop/dist/ReactCrop.css';
 
+// Interval between profile photo status checks after an upload
+const PHOTO_STATUS_POLL_MS = 1000;
+const PHOTO_STATUS_MAX_POLLS = 60;
+
 interface ProfilePhotoUploadProps {
   currentPhotoUrl?: string;
   currentThumbnailUrl?: string;
@@ -156,7 +160,28 @@ const ProfilePhotoUpload: React.FC<ProfilePhotoUploadProps> = ({
         throw new Error(errorData.error || 'Failed to upload profile photo');
       }
 
-      const data = await response.json();
+      let data = await response.json();
+
+      // The server resizes the photo in the background; poll until it's done
+      for (let attempt = 0; data.profile_photo_status === 'processing'; attempt++) {
+        if (attempt >= PHOTO_STATUS_MAX_POLLS) {
+          throw new Error('Timed out waiting for profile photo processing');
+        }
+        await new Promise((resolve) => setTimeout(resolve, PHOTO_STATUS_POLL_MS));
+        const statusResponse = await fetch('/api/users/profile_photo_info/', {
+          headers: {
+            'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
+          },
+        });
+        if (!statusResponse.ok) {
+          throw new Error('Failed to check profile photo status');
+        }
+        data = await statusResponse.json();
+      }
+
+      if (data.profile_photo_status === 'failed') {
+        throw new Error('Failed to process profile photo');
+      }
 
       // Update parent component
       onPhotoUpdated({
@@ -5,15 +5,69 @@ Test script for profile photo functionality.
 
 import requests
 import io
-from PIL import Image
+from requests.adapters import HTTPAdapter
 import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+try:
+    import orjson
+    parse_json = orjson.loads
+except ImportError:  # Optional faster parser; stdlib json is used without it
+    parse_json = json.loads
 
 # Configuration
 BASE_URL = "http://localhost:8000"
 API_URL = f"{BASE_URL}/api"
+PHOTO_STATUS_POLL_SECONDS = 1
+PHOTO_STATUS_MAX_POLLS = 60
+
+# One keep-alive connection pool for every request the script makes
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# Any valid JPEG satisfies the upload endpoint, so a tiny 16x16 baseline
+# JPEG is shipped as bytes; pass --realistic to draw a 400x400 one with Pillow
+REALISTIC_IMAGE = "--realistic" in sys.argv
+
+_TEST_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010101000100010000ffdb00430003020202020203"
+    "0202020303030304060404040404080606050609080a0a090809090a0c0f0c0a"
+    "0b0e0b09090d110d0e0f101011100a0c12131210130f101010ffdb0043010303"
+    "0304030408040408100b090b1010101010101010101010101010101010101010"
+    "101010101010101010101010101010101010101010101010101010101010ffc0"
+    "0011080010001003012200021101031101ffc400160001010100000000000000"
+    "000000000000070405ffc4002410000104010402020300000000000000000102"
+    "030406050708121311220014093132ffc4001501010100000000000000000000"
+    "000000000006ffc4002311000102050305000000000000000000000102110304"
+    "05062100123115166181e1ffda000c03010002110311003f0014a6d26a1b73c1"
+    "e61312d4951cf31163e42565beba5aec694540b1e520b254a51fd2cab8faf220"
+    "ab963d976c9335e69b77d7e66da71781a5571c7f1cea71e24b39d7e32253f21a"
+    "69ded4714a38b482e84b892a71691ecd2d213bf1efb91a74aceea15a758ed548"
+    "ac655b858b81857b21299867a96b94b949654fb9c88529114b812af07ad9f23c"
+    "807e55be0df662a140cce8e69a3d5cb743b3d77a6558b1d9512188bf64b8d3f1"
+    "c3680429c0d0febb3c02e03c5407b4bdd97b54e627fb6edf9460148262138db8"
+    "529828370589727960e432896fc3828ea7528cea208dbe78191f07ad7fffd9"
+)
+
+# Encoded Pillow test image, built on first use
+_TEST_IMAGE_BYTES = None
 
 def create_test_image():
-    """Create a simple test image"""
+    """Return a simple test image as a fresh BytesIO"""
+    global _TEST_IMAGE_BYTES
+    if not REALISTIC_IMAGE:
+        return io.BytesIO(_TEST_JPEG)
+    if _TEST_IMAGE_BYTES is None:
+        _TEST_IMAGE_BYTES = _render_test_image()
+    return io.BytesIO(_TEST_IMAGE_BYTES)
+
+def _render_test_image():
+    """Draw and JPEG-encode the test image"""
+    from PIL import Image
+
     # Create a 400x400 red square image for testing
     img = Image.new('RGB', (400, 400), color='red')
 
@@ -49,9 +103,8 @@ def create_test_image():
     # Convert to bytes
     img_bytes = io.BytesIO()
     img.save(img_bytes, format='JPEG', quality=85)
-    img_bytes.seek(0)
 
-    return img_bytes
+    return img_bytes.getvalue()
 
 def test_profile_photo_endpoints():
     """Test the profile photo endpoints"""
@@ -59,7 +112,13 @@ def test_profile_photo_endpoints():
     print("Testing Profile Photo Functionality")
     print("=" * 50)
 
-    # Test user login first (assuming we have a test user)
+    # Render the upload image on a background thread while the login and
+    # info requests are in flight; PIL releases the GIL while encoding
+    image_executor = ThreadPoolExecutor(max_workers=1)
+    image_future = image_executor.submit(create_test_image)
+    image_executor.shutdown(wait=False)
+
+    # Test user login first (create it with: python manage.py createtestuser)
     login_data = {
         "email": "test@example.com",  # You may need to adjust this
         "password": "testpassword123"
@@ -67,14 +126,14 @@ def test_profile_photo_endpoints():
 
     print("1. Testing user authentication...")
     try:
-        response = requests.post(f"{API_URL}/auth/login/", json=login_data)
+        response = session.post(f"{API_URL}/auth/login/", json=login_data)
 
         if response.status_code == 200:
-            data = response.json()
+            data = parse_json(response.content)
             access_token = data.get('access')
             if access_token:
                 print("[OK] Authentication successful")
-                headers = {'Authorization': f'Bearer {access_token}'}
+                session.headers.update({'Authorization': f'Bearer {access_token}'})
             else:
                 print("[ERROR] No access token in response")
                 return
@@ -90,10 +149,10 @@ def test_profile_photo_endpoints():
     # Test getting current profile photo info
     print("2. Getting current profile photo info...")
     try:
-        response = requests.get(f"{API_URL}/users/profile_photo_info/", headers=headers)
+        response = session.get(f"{API_URL}/users/profile_photo_info/")
 
         if response.status_code == 200:
-            data = response.json()
+            data = parse_json(response.content)
             print("[OK] Profile photo info retrieved:")
             print(f"   - Has custom photo: {data.get('has_custom_photo', False)}")
             print(f"   - Photo URL: {data.get('profile_photo_url', 'None')}")
@@ -108,21 +167,35 @@ def test_profile_photo_endpoints():
     # Test uploading a profile photo
     print("3. Testing profile photo upload...")
     try:
-        test_image = create_test_image()
+        test_image = image_future.result()
 
         files = {
             'profile_photo': ('test_profile.jpg', test_image, 'image/jpeg')
         }
 
-        response = requests.post(f"{API_URL}/users/upload_profile_photo/",
-                               files=files, headers=headers)
-
-        if response.status_code == 200:
-            data = response.json()
+        response = session.post(f"{API_URL}/users/upload_profile_photo/",
+                               files=files)
+
+        if response.status_code == 202:
+            data = parse_json(response.content)
+            # The photo is resized in the background; wait until it's done
+            for _ in range(PHOTO_STATUS_MAX_POLLS):
+                if data.get('profile_photo_status') != 'processing':
+                    break
+                time.sleep(PHOTO_STATUS_POLL_SECONDS)
+                data = parse_json(
+                    session.get(f"{API_URL}/users/profile_photo_info/").content
+                )
+
+        if response.status_code == 202 and data.get('profile_photo_status') == 'ready':
             print("[OK] Profile photo uploaded successfully:")
             print(f"   - Photo URL: {data.get('profile_photo_url', 'None')}")
             print(f"   - Thumbnail URL: {data.get('profile_photo_thumbnail_url', 'None')}")
             print(f"   - Has custom photo: {data.get('has_custom_photo', False)}")
+        elif response.status_code == 202 and data.get('profile_photo_status') == 'processing':
+            print(f"[ERROR] Profile photo still processing after {PHOTO_STATUS_MAX_POLLS} checks")
+        elif response.status_code == 202:
+            print("[ERROR] Failed to process profile photo")
         else:
             print(f"[ERROR] Failed to upload profile photo: {response.status_code}")
             print(f"Response: {response.text}")
@@ -133,11 +206,10 @@ def test_profile_photo_endpoints():
     # Test deleting profile photo
     print("4. Testing profile photo deletion...")
     try:
-        response = requests.delete(f"{API_URL}/users/delete_profile_photo/",
-                                 headers=headers)
+        response = session.delete(f"{API_URL}/users/delete_profile_photo/")
 
         if response.status_code == 200:
-            data = response.json()
+            data = parse_json(response.content)
             print("[OK] Profile photo deleted successfully:")
             print(f"   - Photo URL: {data.get('profile_photo_url', 'None')}")
             print(f"   - Thumbnail URL: {data.get('profile_photo_thumbnail_url', 'None')}")